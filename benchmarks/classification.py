@@ -0,0 +1,55 @@
+import argparse
+import time
+from antlr4 import InputStream
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import Formatter, NodeType, _keyword_contexts
+from raccoon_sql_polisher.parsing import load_recognizers, parse_statements
+from raccoon_sql_polisher.splitter import split_statements
+
+PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+
+
+def isinstance_scan(node):
+    # the classification before the lookup tables, for comparison
+    node_type = NodeType.REGULAR
+    node_parent = node.parentCtx
+    if isinstance(node_parent, PostgreSQLParser.Func_applicationContext) or node.getText() in ("(", ")"):
+        if node.getText() == "(":
+            node_type = NodeType.LEFT_PARENTHESIS
+        else:
+            node_type = NodeType.RIGHT_PARENTHESIS
+    elif node.getText().startswith("'") and node.getText().endswith("'"):
+        node_type = NodeType.STRING
+    elif node.getText().lower() in ["avg", "count", "nosw"]:
+        node_type = NodeType.KEYWORD
+    elif node.getText() == ".":
+        node_type = NodeType.DOT
+    elif node.getText() == ",":
+        node_type = NodeType.COMMA
+    elif isinstance(node_parent, _keyword_contexts()):
+        node_type = NodeType.KEYWORD
+    return node_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaf classification: isinstance scan vs lookup tables.")
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    trees = parse_statements(split_statements(PostgreSQLLexer(InputStream(make_corpus(args.statements)))))
+    leaves = [leaf for _, tree in trees for leaf in Formatter.get_leaf_nodes(tree)]
+    assert [isinstance_scan(leaf) for leaf in leaves] == [Formatter.determine_node_type(leaf) for leaf in leaves]
+    print(f"{len(leaves)} leaves")
+    for name, classify in (("isinstance scan", isinstance_scan), ("lookup tables", Formatter.determine_node_type)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for leaf in leaves:
+                classify(leaf)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<16} {best * 1000:8.1f} ms   {best / len(leaves) * 1e9:6.0f} ns/leaf")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import tempfile
+from pathlib import Path
+from streaming import MODES, measure
+
+
+def make_dump(number_of_rows: int) -> str:
+    # shaped like plain pg_dump output: DDL, then a COPY block with tab separated rows
+    rows = "".join(
+        f"{i}\tuser_{i}\tuser_{i}@example.com\t2024-01-{i % 28 + 1:02d} 12:00:00\t\\N\n"
+        for i in range(number_of_rows)
+    )
+    return (
+        "CREATE TABLE users (id integer NOT NULL, name text, email text, created timestamp, note text);\n\n"
+        "COPY public.users (id, name, email, created, note) FROM stdin;\n"
+        + rows
+        + "\\.\n\n"
+        "ALTER TABLE ONLY public.users ADD CONSTRAINT users_pkey PRIMARY KEY (id);\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Formatting speed and peak RSS of dumps with COPY data blocks.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sql_file = Path(tmp_dir) / "dump.sql"
+        for number_of_rows in args.rows:
+            dump = make_dump(number_of_rows)
+            size_mib = len(dump) / 1024 / 1024
+            for mode in MODES:
+                sql_file.write_text(dump)
+                elapsed, peak_kib = measure(sql_file, mode)
+                # streaming modes copy the data in chunks, their peak RSS must not grow with it
+                print(
+                    f"{number_of_rows:>9} rows ({size_mib:6.1f} MiB)   "
+                    f"{mode:<9} {elapsed:7.3f} s   "
+                    f"{size_mib / elapsed:7.1f} MiB/s   "
+                    f"peak RSS {peak_kib / 1024:6.1f} MiB"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from pathlib import Path
+
+SAMPLES_DIR = Path(__file__).resolve().parent.parent / "tests"
+
+
+def sample_statements() -> list[str]:
+    statements = []
+    for sample in sorted(SAMPLES_DIR.glob("*.sql")):
+        statements += [s.strip() + ";" for s in sample.read_text().split(";") if s.strip()]
+    return statements
+
+
+def make_corpus(number_of_statements: int) -> str:
+    statements = sample_statements()
+    return "\n\n".join(
+        statements[i % len(statements)] for i in range(number_of_statements)
+    ) + "\n"
@@ -0,0 +1,43 @@
+import argparse
+import random
+import time
+from antlr4 import InputStream
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import Formatter
+from raccoon_sql_polisher.parsing import load_recognizers, parse_statements
+from raccoon_sql_polisher.splitter import split_statements
+from raccoon_sql_polisher.walker import SparseParseTreeWalker
+
+PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+
+CONFIGURATIONS = {
+    "default": {},
+    "newline_after_comma": dict(newline_after_comma=True),
+    "indent": dict(indent=True),
+    "max_words_per_line": dict(max_words_per_line=3),
+    "ugly": dict(ugly=True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Formatting time of parsed statements per option set.")
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    trees = [tree for _, tree in parse_statements(split_statements(PostgreSQLLexer(InputStream(make_corpus(args.statements)))))]
+    walker = SparseParseTreeWalker(PostgreSQLParser.ruleNames)
+    for name, formatter_options in CONFIGURATIONS.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            random.seed(0)
+            formatter = Formatter(**formatter_options)
+            start = time.perf_counter()
+            for tree in trees:
+                walker.walk(formatter, tree)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<20} {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+from raccoon_sql_polisher.formatter import SqlFormatter, format_sql, format_sql_file
+
+STATEMENTS = (
+    "select 1",
+    "select a, b from t where a = 1",
+    "insert into t values (1, 'a')",
+    "update t set a = 2 where b = 'x'",
+)
+
+
+def per_call(function, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        function(STATEMENTS[i % len(STATEMENTS)])
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call overhead of formatting small statements.")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    sql_formatter = SqlFormatter()
+    sql_file = Path(tempfile.mkdtemp()) / "statement.sql"
+
+    def through_file(sql_text: str) -> str:
+        sql_file.write_text(sql_text)
+        with contextlib.redirect_stdout(io.StringIO()):
+            format_sql_file(sql_file)
+        return sql_file.read_text()
+
+    # warm up the DFA cache
+    per_call(format_sql, 100)
+    for label, function in (
+        ("temporary file", through_file),
+        ("format_sql", format_sql),
+        ("SqlFormatter", sql_formatter.format),
+    ):
+        print(f"{label:<16} {per_call(function, args.calls) * 1e6:8.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import random
+import statistics
+import time
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import finish_fragments, format_sql_text_fragments
+from raccoon_sql_polisher.incremental import IncrementalFormatter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of reformatting a large buffer after a single edit.")
+    parser.add_argument("--statements", type=int, default=1500)
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args()
+
+    text = make_corpus(args.statements)
+    formatter = IncrementalFormatter()
+    formatter.format(text)
+    print(f"{args.statements} statements, {text.count(chr(10))} lines")
+
+    full, incremental = [], []
+    random_generator = random.Random(0)
+    for _ in range(args.edits):
+        # renames an identifier somewhere in the buffer, like a user typing in an editor
+        position = random_generator.randrange(len(text))
+        position = text.find(" t", position)
+        if position < 0:
+            continue
+        text = text[:position] + " renamed_" + text[position + 1:]
+
+        start = time.perf_counter()
+        expected = "".join(finish_fragments(format_sql_text_fragments(text, formatter.formatter_options), formatter.formatter_options))
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        formatted_code = formatter.format(text)
+        incremental.append(time.perf_counter() - start)
+        assert formatted_code == expected
+
+    print(f"full reformat    median {statistics.median(full) * 1000:9.1f} ms")
+    print(f"incremental      median {statistics.median(incremental) * 1000:9.1f} ms"
+          f"   speedup {statistics.median(full) / statistics.median(incremental):6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import time
+import tracemalloc
+from antlr4 import InputStream, Token
+from corpus import make_corpus
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.streams import CompactInputStream
+
+PostgreSQLLexer, _ = load_recognizers()
+
+
+def measure(stream_class, text: str) -> tuple[int, float]:
+    tracemalloc.start()
+    stream = stream_class(text)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    lexer = PostgreSQLLexer(stream)
+    start = time.perf_counter()
+    while lexer.nextToken().type != Token.EOF:
+        pass
+    return size, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and lexing time of the stock vs the compact input stream.")
+    parser.add_argument("--statements", type=int, default=4000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.statements)
+    # the samples contain some characters beyond Latin-1, every one of them costs the stock
+    # stream an int object and makes the compact stream use 2 bytes per character
+    texts = {"ascii": corpus.encode("ascii", "replace").decode(), "samples": corpus}
+    # warm up the lexer DFA
+    measure(InputStream, corpus)
+    for label, text in texts.items():
+        print(f"{label}: {len(text) / 1024:.1f} KiB of text")
+        for stream_class in (InputStream, CompactInputStream):
+            size, elapsed = measure(stream_class, text)
+            print(f"  {stream_class.__name__:<20} stream {size / 1024 / 1024:7.2f} MiB   lexing {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
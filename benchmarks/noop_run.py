@@ -0,0 +1,40 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from corpus import sample_statements
+
+
+def run(path: Path, *options: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "from raccoon_sql_polisher.formatter import main; main()", str(path), *options],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI run over a tree of already formatted files.")
+    parser.add_argument("--files", type=int, default=2000)
+    args = parser.parse_args()
+
+    statements = sample_statements()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["RACCOON_CACHE_DIR"] = str(Path(tmp_dir) / "cache")
+        tree = Path(tmp_dir) / "tree"
+        for i in range(args.files):
+            sql_file = tree / f"{i % 50}" / f"{i}.sql"
+            sql_file.parent.mkdir(parents=True, exist_ok=True)
+            sql_file.write_text(statements[i % len(statements)] + "\n")
+        print(f"first run           {run(tree):7.2f} s")
+        print(f"no-op run           {run(tree):7.2f} s")
+        print(f"no-op run, --force  {run(tree, '--force'):7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import time
+from raccoon_sql_polisher.output import OutputBuffer
+
+
+class Concatenation:
+    # how the formatter built its output before OutputBuffer
+    def __init__(self):
+        self.formatted_code = ""
+
+    def append(self, text: str):
+        self.formatted_code += text
+
+
+def build(output, words: list[str]) -> float:
+    start = time.perf_counter()
+    for word in words:
+        output.append(word)
+    output.append(";")
+    if isinstance(output, OutputBuffer):
+        output.replace_tail(2, "\n" + output.tail(2))
+        output.getvalue()
+    else:
+        output.formatted_code = output.formatted_code[:-2] + "\n" + output.formatted_code[-2:]
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Building formatter output by concatenation vs OutputBuffer.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256, 1024], help="output sizes in KiB")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        # leaves of a huge INSERT ... VALUES, about 6 characters each
+        words = [" (1, ", "'abc'", ")", ","] * (size * 1024 // 24)
+        concatenation = build(Concatenation(), words)
+        buffer = build(OutputBuffer(), words)
+        print(f"{size:>5} KiB   concatenation {concatenation:7.3f} s   OutputBuffer {buffer:7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from antlr4 import InputStream
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import format_sql_file
+from raccoon_sql_polisher.parallel import StatementPool
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.splitter import split_statements
+
+PostgreSQLLexer, _ = load_recognizers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of intra-file parallel formatting.")
+    parser.add_argument("--statements", type=int, default=4000)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.statements)
+    print(f"{args.statements} statements, {os.cpu_count()} CPUs available")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sql_file = Path(tmp_dir) / "corpus.sql"
+        for jobs in args.jobs:
+            sql_file.write_text(corpus)
+            with StatementPool(jobs) as pool:
+                # one chunk per worker, so all of them start and load the recognizers before timing
+                warm_up = "SELECT 1;" * jobs * pool.chunk_size
+                list(pool.format_statements(split_statements(PostgreSQLLexer(InputStream(warm_up))), {}))
+                start = time.perf_counter()
+                format_sql_file(sql_file, pool=pool)
+                elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"--jobs {jobs:<3} {elapsed:7.2f} s   speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import time
+import tracemalloc
+from antlr4 import InputStream
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import format_statements
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.splitter import split_statements
+
+PostgreSQLLexer, _ = load_recognizers()
+FORMATTER_OPTIONS = dict(ugly=False, newline_after_comma=False, indent=True, max_words_per_line=None, terminal_style=None)
+
+
+def run(statements: list, parse_trees: bool) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in format_statements(statements, FORMATTER_OPTIONS, parse_trees=parse_trees):
+        pass
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Formatting from a parse tree vs. formatting while parsing.")
+    parser.add_argument("--statements", type=int, default=500)
+    parser.add_argument("--statement-size", type=int, default=1, help="select list repetitions per statement")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.statements)
+    if args.statement_size > 1:
+        # one huge statement per corpus, where the tree dominates memory
+        corpus = "SELECT " + ", ".join(["a.b + count(c) * 2"] * args.statement_size) + " FROM t;\n" + corpus
+    statements = list(split_statements(PostgreSQLLexer(InputStream(corpus))))
+    # warm up the DFA cache, so both runs parse at the same speed
+    run(statements, True)
+    for label, parse_trees in (("parse tree + walk", True), ("parse listener", False)):
+        elapsed, peak = run(statements, parse_trees)
+        print(f"{label:<18} {elapsed:6.2f} s, peak traced memory {peak / 1024 / 1024:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
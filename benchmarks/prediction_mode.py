@@ -0,0 +1,40 @@
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from raccoon_sql_polisher.parsing import PREDICTION_MODES
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time per ANTLR prediction mode, cold DFA.")
+    parser.add_argument("--statements", type=int, default=500)
+    args = parser.parse_args()
+
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {str(BENCHMARKS_DIR)!r})\n"
+        "from antlr4 import CommonTokenStream, InputStream\n"
+        "from corpus import make_corpus\n"
+        "from raccoon_sql_polisher.parsing import ParseStats, load_recognizers, parse\n"
+        "PostgreSQLLexer, PostgreSQLParser = load_recognizers()\n"
+        f"tokens = CommonTokenStream(PostgreSQLLexer(InputStream(make_corpus({args.statements}))))\n"
+        "tokens.fill()\n"
+        "stats = ParseStats()\n"
+        "start = time.perf_counter()\n"
+        "parse(PostgreSQLParser(tokens), prediction_mode=sys.argv[1], stats=stats)\n"
+        "print(f'{time.perf_counter() - start:.3f}s  {stats.summary()}')\n"
+    )
+    # every mode runs in a fresh process without the DFA snapshot, so it starts cold
+    env = dict(os.environ, RACCOON_NO_CACHE="1")
+    for mode in PREDICTION_MODES:
+        output = subprocess.run(
+            [sys.executable, "-c", code, mode], env=env, check=True, capture_output=True, text=True
+        ).stdout.strip()
+        print(f"{mode:<10} {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from patchGenerated import serialized_atn_source  # noqa: E402
+
+from raccoon_sql_polisher.lexer.PostgreSQLLexer import serializedATN as lexer_atn  # noqa: E402
+from raccoon_sql_polisher.parser.PostgreSQLParser import serializedATN as parser_atn  # noqa: E402
+
+
+def list_literal_source(values) -> str:
+    lines = [
+        "        " + ",".join(map(str, values[i:i + 16])) + ","
+        for i in range(0, len(values), 16)
+    ]
+    return "def serializedATN():\n    return [\n" + "\n".join(lines) + "\n    ]\n"
+
+
+def measure(module_dir: str, module: str, env: dict) -> tuple[float, float, int]:
+    # VmHWM is reset by exec, unlike ru_maxrss which a forked child inherits from this process
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {module_dir!r})\n"
+        "from antlr4.atn.ATNDeserializer import ATNDeserializer\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        f"serialized_atn = {module}.serializedATN()\n"
+        "loaded = time.perf_counter()\n"
+        "ATNDeserializer().deserialize(serialized_atn)\n"
+        "deserialized = time.perf_counter()\n"
+        "peak_kib = next(\n"
+        "    int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:')\n"
+        ")\n"
+        "print(loaded - start, deserialized - loaded, peak_kib)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+    ).stdout.split()
+    return float(output[0]), float(output[1]), int(output[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import time and peak RSS of list-literal vs binary serialized ATNs."
+    )
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.TemporaryDirectory() as module_dir:
+        for name, values in (("lexer", list(lexer_atn())), ("parser", list(parser_atn()))):
+            variants = {
+                f"{name}_list": list_literal_source(values),
+                f"{name}_blob": "import sys\nfrom array import array\n\n" + serialized_atn_source(values),
+            }
+            results = {}
+            for module, source in variants.items():
+                Path(module_dir, f"{module}.py").write_text(source)
+                # first import compiles the .pyc, it is not measured
+                measure(module_dir, module, env)
+                results[module] = []
+            for _ in range(args.runs):
+                for module in variants:
+                    results[module].append(measure(module_dir, module, env))
+            for module, samples in results.items():
+                pyc_size = sum(
+                    f.stat().st_size for f in Path(module_dir, "__pycache__").glob(f"{module}.*.pyc")
+                )
+                print(
+                    f"{module:<12} import+serializedATN() "
+                    f"{statistics.median(s[0] for s in samples) * 1000:6.2f} ms   "
+                    f"deserialize {statistics.median(s[1] for s in samples) * 1000:6.1f} ms   "
+                    f"peak RSS {statistics.median(s[2] for s in samples) / 1024:5.1f} MiB   "
+                    f".pyc {pyc_size / 1024:6.1f} KiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import time
+from antlr4 import InputStream
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import Formatter, NodeType
+from raccoon_sql_polisher.parsing import load_recognizers, parse_statements
+from raccoon_sql_polisher.splitter import split_statements
+
+PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+
+CONFIGURATIONS = {
+    "default": {},
+    "newline_after_comma": dict(newline_after_comma=True),
+    "indent_after_keyword": dict(indent_after_keyword=True),
+}
+
+
+class DecisionTreeFormatter(Formatter):
+    # the spacing before the compiled transition table, for comparison
+    def _space(self, node_type: NodeType, node_text: str, formatted_node_text: str) -> str:
+        if node_type is NodeType.KEYWORD:
+            if node_text.upper() == "SELECT":
+                self.inside_select_clause = True
+            if node_text.upper() == "VALUES":
+                self.inside_select_clause = False
+                self.inside_values_clause = True
+            elif node_text.upper() in ("FROM", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "SET"):
+                self.inside_select_clause = False
+                self.inside_values_clause = False
+            self.word_counter=0
+
+        if not self.column_constraints:
+            if node_type is NodeType.KEYWORD:
+                if node_text.upper() == "VALUES":
+                    formatted_node_text = "\n" + node_text.upper() + " "
+                elif self.prev_node_type is None:
+                    formatted_node_text = node_text.upper()
+                elif (
+                        self.prev_node_type is NodeType.REGULAR
+                        or self.prev_node_type is NodeType.STRING
+                ):
+                    formatted_node_text = "\n" + node_text.upper()
+                else:
+                    formatted_node_text = " " + node_text.upper()
+            elif node_type is NodeType.COMMA:
+                if self.newline_after_comma and self.inside_select_clause:
+                    formatted_node_text = node_text + "\n"
+                else:
+                    formatted_node_text = node_text + ""
+            elif node_type is NodeType.DOT:
+                formatted_node_text = node_text
+            elif node_type is NodeType.LEFT_PARENTHESIS:
+                if self.create_table_stmt:
+                    self.column_constraints = True
+                    formatted_node_text = " " + node_text + "\n"
+                elif self.prev_node_type is NodeType.KEYWORD:
+                    formatted_node_text = node_text
+                else:
+                    formatted_node_text = " " + node_text
+            elif node_type is NodeType.RIGHT_PARENTHESIS:
+                formatted_node_text = node_text
+            elif node_type is NodeType.STRING:
+                if self.prev_node_type is NodeType.LEFT_PARENTHESIS:
+                    formatted_node_text = node_text
+                else:
+                    formatted_node_text = " " + node_text
+            elif node_type is NodeType.REGULAR:
+                if (
+                        self.prev_node_type is NodeType.DOT
+                        or self.prev_node_type is NodeType.LEFT_PARENTHESIS
+                ):
+                    formatted_node_text = node_text.lower()
+                elif (
+                        self.indent_after_keyword
+                        and self.prev_node_type is NodeType.KEYWORD
+                ):
+                    formatted_node_text = "\n\t" + node_text.lower()
+                else:
+                    formatted_node_text = " " + node_text.lower()
+        else:
+            if node_type is NodeType.REGULAR:
+                if self.prev_node_type is NodeType.LEFT_PARENTHESIS:
+                    formatted_node_text = node_text.lower()
+                elif self.prev_node_type is NodeType.REGULAR:
+                    formatted_node_text = " " + node_text.lower()
+                elif self.prev_node_type is NodeType.COMMA:
+                    formatted_node_text = "\n" + node_text.lower()
+                elif self.prev_node_type is NodeType.KEYWORD:
+                    formatted_node_text = " " + node_text.lower()
+                else:
+                    formatted_node_text = node_text.lower()
+
+            elif node_type is NodeType.KEYWORD:
+                formatted_node_text = " " + node_text.upper()
+            elif node_type is NodeType.LEFT_PARENTHESIS:
+                formatted_node_text = node_text
+            elif node_type is NodeType.RIGHT_PARENTHESIS:
+                formatted_node_text = node_text
+            elif node_type is NodeType.STRING:
+                formatted_node_text = " " + node_text
+
+        return formatted_node_text
+
+
+def replay(formatter: Formatter, statements: list) -> list:
+    # runs the spacing pass alone over the classified leaves of every statement
+    space = formatter._space
+    pieces = []
+    for first_leaf, leaves in statements:
+        formatter.reset_statement()
+        formatter.begin_statement(first_leaf)
+        for node_type, text in leaves:
+            pieces.append(space(node_type, text, text))
+            formatter.prev_node_type = node_type
+    return pieces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spacing decisions: nested conditionals vs compiled transition table.")
+    parser.add_argument("--statements", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    statements = []
+    for _, tree in parse_statements(split_statements(PostgreSQLLexer(InputStream(make_corpus(args.statements))))):
+        leaves = list(Formatter.get_leaf_nodes(tree))
+        classified = [(Formatter.determine_node_type(leaf), leaf.getText()) for leaf in leaves]
+        statements.append((leaves[0], [(node_type, text) for node_type, text in classified if text.strip()]))
+    print(f"{sum(len(leaves) for _, leaves in statements)} leaves")
+    for name, formatter_options in CONFIGURATIONS.items():
+        assert replay(DecisionTreeFormatter(**formatter_options), statements) == replay(Formatter(**formatter_options), statements)
+        for label, formatter_class in (("conditionals", DecisionTreeFormatter), ("table", Formatter)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                formatter = formatter_class(**formatter_options)
+                start = time.perf_counter()
+                replay(formatter, statements)
+                best = min(best, time.perf_counter() - start)
+            leaves = sum(len(leaves) for _, leaves in statements)
+            print(f"{name:<20} {label:<12} {best * 1000:8.1f} ms   {best / leaves * 1e9:6.0f} ns/leaf")
+
+
+if __name__ == "__main__":
+    main()
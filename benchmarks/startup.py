@@ -0,0 +1,58 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+IMPORT_RECOGNIZERS = (
+    "import raccoon_sql_polisher.lexer.PostgreSQLLexer, "
+    "raccoon_sql_polisher.parser.PostgreSQLParser"
+)
+
+
+def time_import(env: dict, runs: int) -> list[float]:
+    timings = []
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"{IMPORT_RECOGNIZERS}; "
+        "print(time.perf_counter() - start)"
+    )
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+        ).stdout
+        timings.append(float(output))
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    print(
+        f"{label:<24} median {statistics.median(timings) * 1000:8.1f} ms   "
+        f"min {min(timings) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup cost of the lexer and parser imports.")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        uncached_env = dict(env, RACCOON_NO_CACHE="1")
+        cached_env = dict(env, RACCOON_CACHE_DIR=cache_dir)
+        # warm-up run writes the .pyc files and the ATN cache entries
+        time_import(cached_env, 1)
+        uncached, cached = [], []
+        # interleave the variants so machine noise hits both equally
+        for _ in range(args.runs):
+            uncached += time_import(uncached_env, 1)
+            cached += time_import(cached_env, 1)
+        report("deserialize (no cache)", uncached)
+        report("ATN cache", cached)
+
+
+if __name__ == "__main__":
+    main()
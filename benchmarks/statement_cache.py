@@ -0,0 +1,42 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import format_sql_file
+from raccoon_sql_polisher.memo import StatementMemo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Formatting time with and without the statement cache.")
+    parser.add_argument("--statements", type=int, default=2000)
+    args = parser.parse_args()
+
+    # the corpus cycles through the sample statements, like boilerplate in generated SQL
+    corpus = make_corpus(args.statements)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["RACCOON_CACHE_DIR"] = tmp_dir
+        sql_file = Path(tmp_dir) / "corpus.sql"
+        # warms up the prediction DFAs, so every run below parses at the same speed
+        sql_file.write_text(corpus)
+        format_sql_file(sql_file)
+        runs = (
+            ("off", lambda: None),
+            ("memory", lambda: StatementMemo()),
+            ("disk, cold", lambda: StatementMemo(disk=True)),
+            ("disk, warm", lambda: StatementMemo(disk=True)),
+        )
+        for name, make_memo in runs:
+            sql_file.write_text(corpus)
+            memo = make_memo()
+            start = time.perf_counter()
+            format_sql_file(sql_file, memo=memo)
+            if memo is not None:
+                memo.close()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<11} {elapsed:7.2f} s   {memo.summary() if memo else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from corpus import make_corpus
+
+MODES = {"buffered": {}, "streaming": dict(stream=True), "mmap": dict(mapped=True)}
+
+
+def measure(sql_file: Path, mode: str) -> tuple[float, int]:
+    # every run is a fresh process, VmHWM then only reflects formatting this one file
+    code = (
+        "import sys, time\n"
+        "from pathlib import Path\n"
+        "from raccoon_sql_polisher.formatter import format_sql_file\n"
+        "start = time.perf_counter()\n"
+        f"format_sql_file(Path({str(sql_file)!r}), **{MODES[mode]!r})\n"
+        "elapsed = time.perf_counter() - start\n"
+        "peak_kib = next(\n"
+        "    int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:')\n"
+        ")\n"
+        "print(elapsed, peak_kib, file=sys.stderr)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stderr.split()
+    return float(output[0]), int(output[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of buffered vs streaming vs memory-mapped formatting.")
+    parser.add_argument("--statements", type=int, nargs="+", default=[1000, 4000, 16000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sql_file = Path(tmp_dir) / "corpus.sql"
+        for number_of_statements in args.statements:
+            corpus = make_corpus(number_of_statements)
+            for mode in MODES:
+                sql_file.write_text(corpus)
+                elapsed, peak_kib = measure(sql_file, mode)
+                print(
+                    f"{number_of_statements:>6} statements ({len(corpus) / 1024:7.1f} KiB)   "
+                    f"{mode:<9} {elapsed:7.2f} s   "
+                    f"peak RSS {peak_kib / 1024:6.1f} MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import time
+from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from corpus import make_corpus
+from raccoon_sql_polisher.formatter import Formatter
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.parser.PostgreSQLParserListener import PostgreSQLParserListener
+from raccoon_sql_polisher.walker import SparseParseTreeWalker
+
+
+class GeneratedListenerFormatter(Formatter, PostgreSQLParserListener):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tree walk cost of the default and the sparse walker.")
+    parser.add_argument("--statements", type=int, default=2000)
+    args = parser.parse_args()
+
+    PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+    tree = PostgreSQLParser(
+        CommonTokenStream(PostgreSQLLexer(InputStream(make_corpus(args.statements))))
+    ).root()
+
+    start = time.perf_counter()
+    ParseTreeWalker().walk(GeneratedListenerFormatter(), tree)
+    default_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SparseParseTreeWalker(PostgreSQLParser.ruleNames).walk(Formatter(), tree)
+    sparse_time = time.perf_counter() - start
+
+    print(f"ParseTreeWalker + generated listener {default_time * 1000:8.1f} ms")
+    print(f"SparseParseTreeWalker                {sparse_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
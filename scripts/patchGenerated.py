@@ -0,0 +1,72 @@
+import sys, os, re, ast
+from array import array
+from glob import glob
+
+ATN_PATTERN = re.compile(
+    r"^(?P<indent>[ \t]+)atn = ATNDeserializer\(\)\.deserialize\(serializedATN\(\)\)\n"
+    r"\s*\n"
+    r"[ \t]+decisionsToDFA = \[ DFA\(ds, i\) for i, ds in enumerate\(atn\.decisionToState\) \]\n",
+    re.MULTILINE,
+)
+SERIALIZED_ATN_PATTERN = re.compile(
+    r"^def serializedATN\(\):\n    return (?P<values>\[\n.*?\n    \])\n",
+    re.MULTILINE | re.DOTALL,
+)
+IMPORT_LINES = (
+    "from array import array\n",
+    "from raccoon_sql_polisher.cache import load_atn\n",
+)
+BYTES_PER_LINE = 24
+
+def main(argv):
+    for file in glob("./PostgreSQL*.py"):
+        if file.endswith(("Base.py", "Listener.py")):
+            continue
+        patch(file)
+
+def serialized_atn_source(values):
+    # The ATN is stored as little-endian int32 bytes: a bytes constant is loaded
+    # from the .pyc with a single copy, unlike a list literal of ~100k ints.
+    blob = array("i", values)
+    if sys.byteorder != "little":
+        blob.byteswap()
+    blob = blob.tobytes()
+    lines = [
+        "    " + repr(blob[i:i + BYTES_PER_LINE])
+        for i in range(0, len(blob), BYTES_PER_LINE)
+    ]
+    return (
+        "SERIALIZED_ATN = (\n" + "\n".join(lines) + "\n)\n"
+        "\n"
+        "def serializedATN():\n"
+        "    atn = array(\"i\", SERIALIZED_ATN)\n"
+        "    if sys.byteorder != \"little\":\n"
+        "        atn.byteswap()\n"
+        "    return atn\n"
+    )
+
+def patch(file_path):
+    print("Patching " + file_path)
+    if not os.path.exists(file_path):
+        print(f"Could not find file: {file_path}")
+        sys.exit(1)
+    recognizer_name = os.path.splitext(os.path.basename(file_path))[0]
+    with open(file_path, 'r') as input_file:
+        code = input_file.read()
+    code = ATN_PATTERN.sub(
+        lambda m: f'{m["indent"]}atn, decisionsToDFA = load_atn(serializedATN(), "{recognizer_name}")\n',
+        code,
+    )
+    code = SERIALIZED_ATN_PATTERN.sub(
+        lambda m: serialized_atn_source(ast.literal_eval(m["values"])),
+        code,
+    )
+    for import_line in reversed(IMPORT_LINES):
+        if import_line not in code:
+            code = code.replace("from antlr4 import *\n", "from antlr4 import *\n" + import_line, 1)
+    print("Writing ...")
+    with open(file_path, 'w') as output_file:
+        output_file.write(code)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,198 @@
+import gc
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+import antlr4.Recognizer
+from antlr4.PredictionContext import PredictionContext
+from antlr4.atn.ATNDeserializer import ATNDeserializer
+from antlr4.atn.ATNSimulator import ATNSimulator
+from antlr4.atn.LexerATNSimulator import LexerATNSimulator
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.dfa.DFA import DFA
+
+CACHE_FORMAT_VERSION = 2
+
+# The deserialized ATN is a deeply linked graph of states and transitions, so
+# pickling it recurses far beyond the default limit. Dumping only happens on a
+# cache miss and is done on a helper thread with a large stack.
+_PICKLE_RECURSION_LIMIT = 100_000
+_PICKLE_STACK_SIZE = 512 * 1024 * 1024
+
+
+# The runtime compares these by identity, so warmed DFAs must point to the singletons of the
+# loading process rather than to unpickled copies. They are pickled by name.
+_SINGLETONS = {
+    "PredictionContext.EMPTY": PredictionContext.EMPTY,
+    "SemanticContext.NONE": SemanticContext.NONE,
+    "ATNSimulator.ERROR": ATNSimulator.ERROR,
+    "LexerATNSimulator.ERROR": LexerATNSimulator.ERROR,
+}
+_SINGLETON_NAMES = {id(singleton): name for name, singleton in _SINGLETONS.items()}
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        return _SINGLETON_NAMES.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, name):
+        try:
+            return _SINGLETONS[name]
+        except KeyError:
+            raise pickle.UnpicklingError(f"unknown singleton {name!r}") from None
+
+
+def get_cache_dir() -> Path | None:
+    if os.environ.get("RACCOON_NO_CACHE"):
+        return None
+    cache_dir = os.environ.get("RACCOON_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return base / "raccoon_sql_polisher"
+
+
+def write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def runtime_fingerprint() -> str:
+    # Recognizer.py carries the runtime version string; statting it is much cheaper
+    # than importlib.metadata, which would cost more than the cache saves.
+    recognizer_file = antlr4.Recognizer.__file__
+    stat = os.stat(recognizer_file)
+    return f"{sys.implementation.cache_tag}:{recognizer_file}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def serialized_atn_digest(serialized_atn) -> str:
+    if not isinstance(serialized_atn, (bytes, bytearray, memoryview, array)):
+        serialized_atn = array("i", serialized_atn)
+    return hashlib.blake2b(serialized_atn, digest_size=16).hexdigest()
+
+
+def _cache_key(serialized_atn) -> str:
+    return hashlib.blake2b(
+        f"{CACHE_FORMAT_VERSION}|{runtime_fingerprint()}|{serialized_atn_digest(serialized_atn)}".encode(),
+        digest_size=16,
+    ).hexdigest()
+
+
+def atn_cache_path(cache_dir: Path, name: str, serialized_atn) -> Path:
+    return cache_dir / f"{name}-{_cache_key(serialized_atn)}.atn"
+
+
+def dfa_snapshot_path(cache_dir: Path, name: str, serialized_atn) -> Path:
+    return cache_dir / f"{name}-{_cache_key(serialized_atn)}.dfa"
+
+
+def _deep_pickle(obj) -> bytes:
+    result = []
+    error = []
+
+    def dump():
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+        try:
+            buffer = io.BytesIO()
+            _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+            result.append(buffer.getvalue())
+        except BaseException as e:
+            error.append(e)
+        finally:
+            sys.setrecursionlimit(limit)
+
+    previous_stack_size = threading.stack_size(_PICKLE_STACK_SIZE)
+    try:
+        thread = threading.Thread(target=dump)
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(previous_stack_size)
+    if error:
+        raise error[0]
+    return result[0]
+
+
+def _deserialize(serialized_atn):
+    atn = ATNDeserializer().deserialize(serialized_atn)
+    decisions_to_dfa = [DFA(ds, i) for i, ds in enumerate(atn.decisionToState)]
+    return atn, decisions_to_dfa
+
+
+def _read_entry(path: Path):
+    try:
+        with open(path, "rb") as cache_file:
+            data = cache_file.read()
+        # the unpickled graph is all new objects, collections would only rescan it
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            format_version, atn, decisions_to_dfa = _Unpickler(io.BytesIO(data)).load()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        if format_version == CACHE_FORMAT_VERSION:
+            return atn, decisions_to_dfa
+    except Exception:
+        # missing, corrupt or incompatible entry
+        pass
+    return None
+
+
+def _write_entry(path: Path, name: str, atn, decisions_to_dfa):
+    write_atomic(path, _deep_pickle((CACHE_FORMAT_VERSION, atn, decisions_to_dfa)))
+    for stale in path.parent.glob(f"{name}-*{path.suffix}"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def load_atn(serialized_atn, name: str):
+    # Cache failures must never break the import, they only fall back to deserializing.
+    # A DFA snapshot holds the same ATN plus warmed prediction DFAs and wins over the plain entry.
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return _deserialize(serialized_atn)
+
+    for path in (
+        dfa_snapshot_path(cache_dir, name, serialized_atn),
+        atn_cache_path(cache_dir, name, serialized_atn),
+    ):
+        entry = _read_entry(path)
+        if entry is not None:
+            return entry
+
+    atn, decisions_to_dfa = _deserialize(serialized_atn)
+    try:
+        _write_entry(atn_cache_path(cache_dir, name, serialized_atn), name, atn, decisions_to_dfa)
+    except (OSError, RecursionError, pickle.PicklingError):
+        pass
+    return atn, decisions_to_dfa
+
+
+def save_dfa_snapshot(recognizer_class) -> Path | None:
+    # Stores the prediction DFAs the recognizer class has learned in this process,
+    # so later processes start warm instead of paying for full ATN simulation.
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+    name = recognizer_class.__name__
+    serialized_atn = sys.modules[recognizer_class.__module__].serializedATN()
+    path = dfa_snapshot_path(cache_dir, name, serialized_atn)
+    _write_entry(path, name, recognizer_class.atn, recognizer_class.decisionsToDFA)
+    return path
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from raccoon_sql_polisher.cache import get_cache_dir, runtime_fingerprint, write_atomic
+
+FILE_CACHE_FORMAT_VERSION = 1
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+def tool_fingerprint() -> str:
+    # any change to the formatter, grammar or runtime may change the output
+    stats = []
+    for source in sorted(PACKAGE_DIR.rglob("*.py")):
+        stat = source.stat()
+        stats.append(f"{source.relative_to(PACKAGE_DIR)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.blake2b(
+        f"{runtime_fingerprint()}|{'|'.join(stats)}".encode(), digest_size=16
+    ).hexdigest()
+
+
+def file_cache_path(cache_dir: Path, formatter_options: dict) -> Path:
+    options_key = hashlib.blake2b(
+        repr(sorted(formatter_options.items())).encode(), digest_size=8
+    ).hexdigest()
+    return cache_dir / f"files-{options_key}.json"
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Records the size, mtime and content digest of every file left in formatted state, so
+# unchanged files are skipped by a stat call on later runs with the same options and tool.
+# A file whose mtime changed but whose content did not (e.g. after a checkout) is skipped
+# after hashing it, without being parsed.
+class FileCache:
+    def __init__(self, formatter_options: dict, path: Path = None):
+        cache_dir = get_cache_dir()
+        self.path = path or (cache_dir and file_cache_path(cache_dir, formatter_options))
+        self.fingerprint = tool_fingerprint()
+        self.skipped = 0
+        self._entries = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "rb") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != FILE_CACHE_FORMAT_VERSION or data.get("tool") != self.fingerprint:
+            return {}
+        return data.get("files", {})
+
+    def is_formatted(self, file: Path) -> bool:
+        entry = self._entries.get(os.path.abspath(file))
+        if entry is None:
+            return False
+        stat = os.stat(file)
+        if stat.st_size != entry[0]:
+            return False
+        if stat.st_mtime_ns != entry[1]:
+            with open(file, "rb") as sql_file:
+                if content_digest(sql_file.read()) != entry[2]:
+                    return False
+            entry[1] = stat.st_mtime_ns
+            self._dirty = True
+        self.skipped += 1
+        return True
+
+    def record(self, file: Path):
+        # called right after formatting file, its current content is in formatted state
+        with open(file, "rb") as sql_file:
+            digest = content_digest(sql_file.read())
+        stat = os.stat(file)
+        self._entries[os.path.abspath(file)] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._dirty = True
+
+    def save(self):
+        if self.path is None or not self._dirty:
+            return
+        data = {"version": FILE_CACHE_FORMAT_VERSION, "tool": self.fingerprint, "files": self._entries}
+        write_atomic(self.path, json.dumps(data, separators=(",", ":")).encode())
+        self._dirty = False
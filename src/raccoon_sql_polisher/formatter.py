@@ -1,27 +1,109 @@
 import argparse
+import filecmp
+import os
 import random
-from enum import Enum
+import shutil
+import sys
+import tempfile
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, TextIO
 from antlr4 import *
+from antlr4.CommonTokenFactory import CommonTokenFactory
 from colorama import init, Fore, Style
-from raccoon_sql_polisher.lexer.PostgreSQLLexer import PostgreSQLLexer
-from raccoon_sql_polisher.parser.PostgreSQLParser import PostgreSQLParser
-from raccoon_sql_polisher.parser.PostgreSQLParserListener import (
-    PostgreSQLParserListener,
+from raccoon_sql_polisher.parsing import (
+    PREDICTION_MODES,
+    TWO_STAGE,
+    ParseStats,
+    ParseBudget,
+    exceeds_token_budget,
+    load_recognizers,
+    parse,
+    parse_within_budget,
 )
+from raccoon_sql_polisher.filecache import FileCache
+from raccoon_sql_polisher.memo import StatementMemo, statement_key
+from raccoon_sql_polisher.output import OutputBuffer
+from raccoon_sql_polisher.spacing import (
+    COLUMN_CONSTRAINTS,
+    COMMA_NEWLINE,
+    CREATE_TABLE,
+    INDENT_AFTER_KEYWORD,
+    NODE_CODES,
+    NUMBER_OF_CODES,
+    PREVIOUS_CODES,
+    SPACING_TABLE,
+    VALUES_KEYWORD,
+    NodeType,
+)
+from raccoon_sql_polisher.splitter import split_statements
+from raccoon_sql_polisher.streams import CompactInputStream, MappedTextReader, UnbufferedCharStream
+from raccoon_sql_polisher.walker import SparseParseTreeWalker
+
+if TYPE_CHECKING:
+    from raccoon_sql_polisher.parallel import StatementPool
+    from raccoon_sql_polisher.parser.PostgreSQLParser import PostgreSQLParser
+
+
+@cache
+def _keyword_contexts() -> tuple:
+    _, PostgreSQLParser = load_recognizers()
+    return (
+        PostgreSQLParser.Having_clauseContext,
+        PostgreSQLParser.Target_labelContext,
+        PostgreSQLParser.Join_typeContext,
+        PostgreSQLParser.Table_refContext,
+        PostgreSQLParser.Join_qualContext,
+        PostgreSQLParser.Group_clauseContext,
+        PostgreSQLParser.Using_clauseContext,
+        PostgreSQLParser.Where_or_current_clauseContext,
+        PostgreSQLParser.A_expr_andContext,
+        PostgreSQLParser.DeletestmtContext,
+        PostgreSQLParser.SelectstmtContext,
+        PostgreSQLParser.InsertstmtContext,
+        PostgreSQLParser.UpdatestmtContext,
+        PostgreSQLParser.Where_clauseContext,
+        PostgreSQLParser.Simple_select_pramaryContext,
+        PostgreSQLParser.From_clauseContext,
+        PostgreSQLParser.CreatestmtContext,
+        PostgreSQLParser.Character_cContext,
+        PostgreSQLParser.ColconstraintelemContext,
+        PostgreSQLParser.ConstdatetimeContext,
+        PostgreSQLParser.Values_clauseContext,
+    )
+
 
+# Identifiers formatted like keywords
+FUNCTION_KEYWORDS = frozenset(("avg", "count", "nosw"))
+# path argument for reading SQL from stdin
+STDIN_PATH = "-"
+
+
+@cache
+def _classification_tables() -> tuple:
+    # Built once, so determine_node_type is a few dict/set lookups per leaf. Parents are
+    # classified by their exact class rather than rule index: labeled alternatives like
+    # Target_labelContext share the rule index of their siblings.
+    PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+    token_types = {
+        PostgreSQLLexer.OPEN_PAREN: NodeType.LEFT_PARENTHESIS,
+        PostgreSQLLexer.CLOSE_PAREN: NodeType.RIGHT_PARENTHESIS,
+        PostgreSQLLexer.DOT: NodeType.DOT,
+        PostgreSQLLexer.COMMA: NodeType.COMMA,
+        PostgreSQLLexer.StringConstant: NodeType.STRING,
+    }
+    context_classes = [c for c in vars(PostgreSQLParser).values() if isinstance(c, type)]
+    keyword_parents = frozenset(c for c in context_classes if issubclass(c, _keyword_contexts()))
+    func_application_parents = frozenset(
+        c for c in context_classes if issubclass(c, PostgreSQLParser.Func_applicationContext)
+    )
+    return token_types, keyword_parents, func_application_parents, PostgreSQLLexer.Identifier
 
-class NodeType(Enum):
-    KEYWORD = "Keyword"
-    REGULAR = "Regular"
-    DOT = "Dot"
-    COMMA = "Comma"
-    LEFT_PARENTHESIS = "Left parenthesis"
-    RIGHT_PARENTHESIS = "Right parenthesis"
-    STRING = "String"
 
+class Formatter(ParseTreeListener):
+    # enterStmt formats all leaves of a statement itself, nothing below it needs a walk
+    consumed_rules = ("stmt",)
 
-class Formatter(PostgreSQLParserListener):
     def __init__(
             self,
             number_of_newlines_after_stmt: int = 2,
@@ -35,7 +117,7 @@ class Formatter(PostgreSQLParserListener):
             **kwargs,
     ):
         super().__init__(*args, **kwargs)
-        self.formatted_code = ""
+        self.output = OutputBuffer()
         self.__number_of_newlines_after_stmt = number_of_newlines_after_stmt
         self.prev_node_type = None
         self.ugly = ugly
@@ -54,65 +136,42 @@ class Formatter(PostgreSQLParserListener):
         self.word_counter = 0
         self.current_line = ""
         self.terminal_style = terminal_style
+        self.first_statement = True
+        self._passes = self._build_passes()
 
-    def get_leaf_nodes(self, ctx):
-        if ctx.getChildCount() == 0:
-            return [ctx]
-        leaves = []
-        for i in range(ctx.getChildCount()):
-            leaves.extend(self.get_leaf_nodes(ctx.getChild(i)))
-        return leaves
+    @staticmethod
+    def get_leaf_nodes(ctx):
+        # Yields the terminals and empty rule contexts below ctx from left to right. An explicit
+        # stack instead of recursion, so deeply nested expressions cannot hit the recursion limit.
+        stack = [ctx]
+        while stack:
+            node = stack.pop()
+            children = getattr(node, "children", None)
+            if children:
+                stack.extend(reversed(children))
+            else:
+                yield node
 
     @staticmethod
     def determine_node_type(node):
-        node_type = NodeType.REGULAR
-        keywords = [
-            PostgreSQLParser.Having_clauseContext,
-            PostgreSQLParser.Target_labelContext,
-            PostgreSQLParser.Join_typeContext,
-            PostgreSQLParser.Table_refContext,
-            PostgreSQLParser.Join_qualContext,
-            PostgreSQLParser.Group_clauseContext,
-            PostgreSQLParser.Group_clauseContext,
-            PostgreSQLParser.Using_clauseContext,
-            PostgreSQLParser.Where_or_current_clauseContext,
-            PostgreSQLParser.A_expr_andContext,
-            PostgreSQLParser.DeletestmtContext,
-            PostgreSQLParser.SelectstmtContext,
-            PostgreSQLParser.InsertstmtContext,
-            PostgreSQLParser.UpdatestmtContext,
-            PostgreSQLParser.Where_clauseContext,
-            PostgreSQLParser.Simple_select_pramaryContext,
-            PostgreSQLParser.From_clauseContext,
-            PostgreSQLParser.CreatestmtContext,
-            PostgreSQLParser.Character_cContext,
-            PostgreSQLParser.ColconstraintelemContext,
-            PostgreSQLParser.Character_cContext,
-            PostgreSQLParser.ColconstraintelemContext,
-            PostgreSQLParser.ColconstraintelemContext,
-            PostgreSQLParser.ConstdatetimeContext,
-            PostgreSQLParser.ColconstraintelemContext,
-            PostgreSQLParser.Values_clauseContext,
-        ]
-        node_parent = node.parentCtx
-        if isinstance(
-                node_parent, PostgreSQLParser.Func_applicationContext
-        ) or node.getText() in ("(", ")"):
-            if node.getText() == "(":
-                node_type = NodeType.LEFT_PARENTHESIS
-            else:
-                node_type = NodeType.RIGHT_PARENTHESIS
-        elif node.getText().startswith("'") and node.getText().endswith("'"):
-            node_type = NodeType.STRING
-        elif node.getText().lower() in ["avg", "count", "nosw"]:
-            node_type = NodeType.KEYWORD
-        elif node.getText() == ".":
-            node_type = NodeType.DOT
-        elif node.getText() == ",":
-            node_type = NodeType.COMMA
-        elif any(isinstance(node_parent, keyword) for keyword in keywords):
-            node_type = NodeType.KEYWORD
-        return node_type
+        token_types, keyword_parents, func_application_parents, identifier = _classification_tables()
+        parent_type = type(node.parentCtx)
+        symbol = getattr(node, "symbol", None)
+        # tokens conjured by error recovery have no index, their text is a "<missing ...>" message
+        token_type = symbol.type if symbol is not None and symbol.tokenIndex >= 0 else None
+        node_type = token_types.get(token_type)
+        if parent_type in func_application_parents:
+            # everything directly below a function application but "(" counts as ")"
+            if node_type is NodeType.LEFT_PARENTHESIS:
+                return node_type
+            return NodeType.RIGHT_PARENTHESIS
+        if node_type is not None:
+            return node_type
+        if token_type == identifier and symbol.text.lower() in FUNCTION_KEYWORDS:
+            return NodeType.KEYWORD
+        if parent_type in keyword_parents:
+            return NodeType.KEYWORD
+        return NodeType.REGULAR
 
     @staticmethod
     def random_case(text: str) -> str:
@@ -121,245 +180,308 @@ class Formatter(PostgreSQLParserListener):
             for char in text
         )
 
+    def _build_passes(self) -> tuple:
+        # Every leaf runs through the passes the options need, nothing else. A pass takes the
+        # node type, the original text and the text formatted so far and returns the new text.
+        passes = [self._space]
+        if self.ugly:
+            passes.append(self._random_case_pass)
+        if self.indent:
+            passes.append(self._indent_pass)
+            passes.append(self._values_layout_pass)
+        if self.max_words_per_line:
+            passes.append(self._wrap_words_pass)
+        return tuple(passes)
+
     def format_node(self, node) -> str:
         node_type = self.determine_node_type(node)
         node_text = node.getText()
-        formatted_node_text = node_text
         if node_text.strip() == "":
             return ""
+        formatted_node_text = node_text
+        for format_pass in self._passes:
+            formatted_node_text = format_pass(node_type, node_text, formatted_node_text)
+        self.prev_node_text = node_text
+        self.prev_node_type = node_type
+
+        # if self.terminal_style:
+        #     if self.terminal_style not in ["Style.BRIGHT", "Style.DIM", "Style.NORMAL"]:
+        #         raise ValueError(
+        #             f"Invalid terminal_style value. Must be one of Style.BRIGHT, Style.DIM, Style.NORMAL.")
+        #     else:
+        #         print(f"{self.terminal_style}{Fore.LIGHTWHITE_EX}{formatted_node_text}{Style.RESET_ALL}")
+        #
+        #
+        # print("self.terminal_style}{Fore.LIGHTWHITE_EX}{formatted_node_text}{Style.RESET_ALL")
+        # print(f"{self.terminal_style}{Fore.LIGHTWHITE_EX}{formatted_node_text}{Style.RESET_ALL}")
+        return formatted_node_text
 
+    def _space(self, node_type: NodeType, node_text: str, formatted_node_text: str) -> str:
+        code = NODE_CODES[node_type]
         if node_type is NodeType.KEYWORD:
-            if node_text.upper() == "SELECT":
+            keyword = node_text.upper()
+            if keyword == "SELECT":
                 self.inside_select_clause = True
-            if node_text.upper() == "VALUES":
+            if keyword == "VALUES":
                 self.inside_select_clause = False
                 self.inside_values_clause = True
-            elif node_text.upper() in ("FROM", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "SET"):
+                code = VALUES_KEYWORD
+            elif keyword in ("FROM", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "SET"):
                 self.inside_select_clause = False
                 self.inside_values_clause = False
             self.word_counter=0
 
-        if not self.column_constraints:
-            if node_type is NodeType.KEYWORD:
-                if node_text.upper() == "VALUES":
-                    formatted_node_text = "\n" + node_text.upper() + " "
-                elif self.prev_node_type is None:
-                    formatted_node_text = node_text.upper()
-                elif (
-                        self.prev_node_type is NodeType.REGULAR
-                        or self.prev_node_type is NodeType.STRING
-                ):
-                    formatted_node_text = "\n" + node_text.upper()
-                else:
-                    formatted_node_text = " " + node_text.upper()
-            elif node_type is NodeType.COMMA:
-                if self.newline_after_comma and self.inside_select_clause:
-                    formatted_node_text = node_text + "\n"
-                else:
-                    formatted_node_text = node_text + ""
-            elif node_type is NodeType.DOT:
-                formatted_node_text = node_text
-            elif node_type is NodeType.LEFT_PARENTHESIS:
-                if self.create_table_stmt:
-                    self.column_constraints = True
-                    formatted_node_text = " " + node_text + "\n"
-                elif self.prev_node_type is NodeType.KEYWORD:
-                    formatted_node_text = node_text
-                else:
-                    formatted_node_text = " " + node_text
-            elif node_type is NodeType.RIGHT_PARENTHESIS:
-                formatted_node_text = node_text
-            elif node_type is NodeType.STRING:
-                if self.prev_node_type is NodeType.LEFT_PARENTHESIS:
-                    formatted_node_text = node_text
-                else:
-                    formatted_node_text = " " + node_text
-            elif node_type is NodeType.REGULAR:
-                if (
-                        self.prev_node_type is NodeType.DOT
-                        or self.prev_node_type is NodeType.LEFT_PARENTHESIS
-                ):
-                    formatted_node_text = node_text.lower()
-                elif (
-                        self.indent_after_keyword
-                        and self.prev_node_type is NodeType.KEYWORD
-                ):
-                    formatted_node_text = "\n\t" + node_text.lower()
-                else:
-                    formatted_node_text = " " + node_text.lower()
-        else:
-            if node_type is NodeType.REGULAR:
-                if self.prev_node_type is NodeType.LEFT_PARENTHESIS:
-                    formatted_node_text = node_text.lower()
-                elif self.prev_node_type is NodeType.REGULAR:
-                    formatted_node_text = " " + node_text.lower()
-                elif self.prev_node_type is NodeType.COMMA:
-                    formatted_node_text = "\n" + node_text.lower()
-                elif self.prev_node_type is NodeType.KEYWORD:
-                    formatted_node_text = " " + node_text.lower()
-                else:
-                    formatted_node_text = node_text.lower()
+        # one lookup in the compiled spacing rules, see spacing.spacing_index
+        state = (
+            self.column_constraints * COLUMN_CONSTRAINTS
+            + self.create_table_stmt * CREATE_TABLE
+            + bool(self.newline_after_comma and self.inside_select_clause) * COMMA_NEWLINE
+            + bool(self.indent_after_keyword) * INDENT_AFTER_KEYWORD
+        )
+        prefix, case, suffix, enters_column_constraints = SPACING_TABLE[
+            (state * NUMBER_OF_CODES + PREVIOUS_CODES[self.prev_node_type]) * NUMBER_OF_CODES + code
+        ]
+        if enters_column_constraints:
+            self.column_constraints = True
+        return prefix + case(node_text) + suffix
 
-            elif node_type is NodeType.KEYWORD:
-                formatted_node_text = " " + node_text.upper()
-            elif node_type is NodeType.LEFT_PARENTHESIS:
-                formatted_node_text = node_text
-            elif node_type is NodeType.RIGHT_PARENTHESIS:
-                formatted_node_text = node_text
-            elif node_type is NodeType.STRING:
-                formatted_node_text = " " + node_text
+    def _random_case_pass(self, node_type: NodeType, node_text: str, formatted_node_text: str) -> str:
+        if node_type is not NodeType.STRING:
+            return self.random_case(formatted_node_text)
+        return formatted_node_text
 
-        if self.ugly and node_type is not NodeType.STRING:
-            formatted_node_text = self.random_case(formatted_node_text)
+    def _indent_pass(self, node_type: NodeType, node_text: str, formatted_node_text: str) -> str:
+        # the indentation rules have always seen the current node type as the previous one
         self.prev_node_type = node_type
-        if self.indent:
-            upper_node_text = node_text.upper()
-
-            if node_type is NodeType.KEYWORD:
-                if upper_node_text in ("SELECT", "WHERE", "GROUP", "ORDER",
-                                       "HAVING", "LIMIT", "OFFSET", "VALUES",
-                                       "INSERT", "UPDATE", "CREATE", "SET",
-                                       ):
-                    formatted_node_text = "\n" + upper_node_text
-                    self.indent_level = 1
-                    self.new_line = True
+        upper_node_text = node_text.upper()
 
-                elif upper_node_text == "DELETE":
-                    formatted_node_text = "DELETE"
-                    self.indent_level = 1
-                    self.new_line = False
-
-                elif upper_node_text == "FROM":
-                    if self.prev_node_type is NodeType.KEYWORD and self.prev_node_text.upper() == "DELETE":
-                        formatted_node_text = " FROM"
-                        self.new_line = False
-                    else:
-                        formatted_node_text = "\nFROM"
-                        self.indent_level = 1
-                        self.new_line = True
+        if node_type is NodeType.KEYWORD:
+            if upper_node_text in ("SELECT", "WHERE", "GROUP", "ORDER",
+                                   "HAVING", "LIMIT", "OFFSET", "VALUES",
+                                   "INSERT", "UPDATE", "CREATE", "SET",
+                                   ):
+                formatted_node_text = "\n" + upper_node_text
+                self.indent_level = 1
+                self.new_line = True
+
+            elif upper_node_text == "DELETE":
+                formatted_node_text = "DELETE"
+                self.indent_level = 1
+                self.new_line = False
 
-                elif upper_node_text in ("LEFT", "RIGHT", "INNER", "OUTER"):
-                    formatted_node_text = "\n" + (self.indent_str * self.indent_level) + upper_node_text
+            elif upper_node_text == "FROM":
+                if self.prev_node_type is NodeType.KEYWORD and self.prev_node_text.upper() == "DELETE":
+                    formatted_node_text = " FROM"
                     self.new_line = False
-
-                elif upper_node_text == "JOIN":
-                    formatted_node_text = " JOIN" if not self.new_line else "\n" + (
-                                self.indent_str * self.indent_level) + "JOIN"
+                else:
+                    formatted_node_text = "\nFROM"
                     self.indent_level = 1
-                    self.new_line = False
+                    self.new_line = True
 
-                elif upper_node_text == "ON":
-                    formatted_node_text = " ON"
-                    self.new_line = False
+            elif upper_node_text in ("LEFT", "RIGHT", "INNER", "OUTER"):
+                formatted_node_text = "\n" + (self.indent_str * self.indent_level) + upper_node_text
+                self.new_line = False
 
-                elif upper_node_text in ("AND", "OR"):
-                    formatted_node_text = "\n" + (self.indent_str * self.indent_level) + upper_node_text
-                    self.new_line = False
+            elif upper_node_text == "JOIN":
+                formatted_node_text = " JOIN" if not self.new_line else "\n" + (
+                            self.indent_str * self.indent_level) + "JOIN"
+                self.indent_level = 1
+                self.new_line = False
 
+            elif upper_node_text == "ON":
+                formatted_node_text = " ON"
+                self.new_line = False
 
-            elif node_type is NodeType.COMMA:
-                if self.newline_after_comma and self.inside_select_clause:
-                    if not self.indent:
-                        formatted_node_text = node_text + "\n"
-                    else:
-                        formatted_node_text = node_text
-                    self.new_line = True
-                else:
-                    formatted_node_text = node_text + " "
-                    self.new_line = False
+            elif upper_node_text in ("AND", "OR"):
+                formatted_node_text = "\n" + (self.indent_str * self.indent_level) + upper_node_text
+                self.new_line = False
 
 
-            elif node_type is NodeType.LEFT_PARENTHESIS:
+        elif node_type is NodeType.COMMA:
+            if self.newline_after_comma and self.inside_select_clause:
                 formatted_node_text = node_text
-                self.indent_level += 1
+                self.new_line = True
+            else:
+                formatted_node_text = node_text + " "
                 self.new_line = False
 
-            elif node_type is NodeType.RIGHT_PARENTHESIS:
-                formatted_node_text = node_text
-                self.indent_level = max(self.indent_level - 1, 1)
-                self.new_line = False
 
-            elif self.new_line and node_type not in (NodeType.KEYWORD, NodeType.COMMA):
-                formatted_node_text = "\n" + (self.indent_str * self.indent_level) + node_text.strip()
-                self.new_line = False
+        elif node_type is NodeType.LEFT_PARENTHESIS:
+            formatted_node_text = node_text
+            self.indent_level += 1
+            self.new_line = False
+
+        elif node_type is NodeType.RIGHT_PARENTHESIS:
+            formatted_node_text = node_text
+            self.indent_level = max(self.indent_level - 1, 1)
+            self.new_line = False
+
+        elif self.new_line and node_type not in (NodeType.KEYWORD, NodeType.COMMA):
+            formatted_node_text = "\n" + (self.indent_str * self.indent_level) + node_text.strip()
+            self.new_line = False
+        else:
+            if self.prev_node_type is NodeType.DOT or node_type is NodeType.DOT:
+                formatted_node_text = node_text.strip()
             else:
-                if self.prev_node_type is NodeType.DOT or node_type is NodeType.DOT:
-                    formatted_node_text = node_text.strip()
-                else:
-                    formatted_node_text = " " + node_text.strip()
+                formatted_node_text = " " + node_text.strip()
 
-                self.new_line = False
+            self.new_line = False
 
-        if self.indent and self.inside_values_clause:
-            if node_text == "(":
-                formatted_node_text = "\n" + (self.indent_str) + node_text
-                self.new_line = False
-            elif node_text == ")":
-                formatted_node_text = node_text
-                self.new_line = False
-            elif node_text == ",":
-                formatted_node_text = node_text + (self.indent_str)
-                self.new_line = False
+        return formatted_node_text
 
-        self.prev_node_text = node_text
-        self.prev_node_type = node_type
+    def _values_layout_pass(self, node_type: NodeType, node_text: str, formatted_node_text: str) -> str:
+        if not self.inside_values_clause:
+            return formatted_node_text
+        if node_text == "(":
+            formatted_node_text = "\n" + (self.indent_str) + node_text
+            self.new_line = False
+        elif node_text == ")":
+            formatted_node_text = node_text
+            self.new_line = False
+        elif node_text == ",":
+            formatted_node_text = node_text + (self.indent_str)
+            self.new_line = False
 
-        if self.max_words_per_line:
-            words = node_text.split()
-            for word in words:
-                # print("word_counter 1: ", self.word_counter)
-                if word not in [',', ';', '(', ')', '.']:#pomijalne
-                    # print("word_counter 2: ", self.word_counter, "word: ", word)
-                    if self.word_counter + 1 > self.max_words_per_line:
-                        formatted_node_text += self.current_line.strip() + "\n"
-                        self.current_line = word
-                        self.word_counter = 1
-                    else:
-                        if self.current_line:
-                            self.current_line += " " + word
-                            self.word_counter += 1
-                        else:
-                            self.current_line = word
+        return formatted_node_text
+
+    def _wrap_words_pass(self, node_type: NodeType, node_text: str, formatted_node_text: str) -> str:
+        words = node_text.split()
+        for word in words:
+            # print("word_counter 1: ", self.word_counter)
+            if word not in [',', ';', '(', ')', '.']:#pomijalne
+                # print("word_counter 2: ", self.word_counter, "word: ", word)
+                if self.word_counter + 1 > self.max_words_per_line:
+                    formatted_node_text += self.current_line.strip() + "\n"
+                    self.current_line = word
+                    self.word_counter = 1
+                else:
+                    if self.current_line:
+                        self.current_line += " " + word
                         self.word_counter += 1
-            self.current_line = ""  # Resetowanie linii
+                    else:
+                        self.current_line = word
+                    self.word_counter += 1
+        self.current_line = ""  # Resetowanie linii
 
-        # if self.terminal_style:
-        #     if self.terminal_style not in ["Style.BRIGHT", "Style.DIM", "Style.NORMAL"]:
-        #         raise ValueError(
-        #             f"Invalid terminal_style value. Must be one of Style.BRIGHT, Style.DIM, Style.NORMAL.")
-        #     else:
-        #         print(f"{self.terminal_style}{Fore.LIGHTWHITE_EX}{formatted_node_text}{Style.RESET_ALL}")
-        #
-        #
-        # print("self.terminal_style}{Fore.LIGHTWHITE_EX}{formatted_node_text}{Style.RESET_ALL")
-        # print(f"{self.terminal_style}{Fore.LIGHTWHITE_EX}{formatted_node_text}{Style.RESET_ALL}")
         return formatted_node_text
 
-    def enterStmt(self, ctx: PostgreSQLParser.StmtContext):
+    def enterStmt(self, ctx: "PostgreSQLParser.StmtContext"):
         leaves = self.get_leaf_nodes(ctx)
-        if "CREATE" in leaves[0].getText().upper():
-            self.create_table_stmt = True
+        first_leaf = next(leaves)
+        self.begin_statement(first_leaf)
+        append = self.output.append
+        append(self.format_node(first_leaf))
         for leaf in leaves:
-            self.formatted_code += self.format_node(leaf)
+            append(self.format_node(leaf))
 
-    def exitStmt(self, ctx: PostgreSQLParser.StmtContext):
-        self.formatted_code += ";"
+    def exitStmt(self, ctx: "PostgreSQLParser.StmtContext"):
+        self.output.append(";")
         if self.create_table_stmt:
-            self.formatted_code = (
-                    self.formatted_code[:-2] + "\n" + self.formatted_code[-2:]
-            )
-        self.formatted_code += "\n" * self.__number_of_newlines_after_stmt
+            self.output.replace_tail(2, "\n" + self.output.tail(2))
+        self.output.append("\n" * self.__number_of_newlines_after_stmt)
+        self.first_statement = False
+        self.reset_statement()
+
+    def begin_statement(self, first_leaf):
+        if "CREATE" in first_leaf.getText().upper():
+            self.create_table_stmt = True
+
+    def reset_statement(self):
         self.prev_node_type = None
         self.create_table_stmt = False
         self.column_constraints = False
-
-    def exitRoot(self, ctx: PostgreSQLParser.RootContext):
-        self.formatted_code = self.formatted_code[
-                              : -self.__number_of_newlines_after_stmt + 1
-                              ]
+        # No state leaks into the next statement, so statements can be formatted independently.
+        # The first one starts from the initial state, the others from the state a statement
+        # typically leaves behind: on an indented line, with a word on the current line.
+        self.inside_select_clause = False
+        self.inside_values_clause = False
+        self.indent_level = 0 if self.first_statement else 1
+        self.new_line = self.first_statement
+        self.prev_node_text = ""
+        self.word_counter = 0 if self.first_statement else 1
+
+    def exitRoot(self, ctx: "PostgreSQLParser.RootContext"):
+        self.finish()
+
+    def take_with_copy_data(self, data) -> Iterator[str]:
+        # COPY data follows right after the semicolon of its statement, chunk by chunk. Without
+        # data, at the end of the input, the statement ends like any other.
+        newlines = self.__number_of_newlines_after_stmt
+        self.output.drop_tail(newlines)
+        yield self.output.take()
+        empty = True
+        for chunk in data:
+            empty = False
+            yield chunk
+        yield "\n" * (newlines if empty else newlines - 1)
+
+    def copy_verbatim(self, text: str):
+        # for statements that could not be parsed
+        self.output.clear()
+        self.output.append(text + "\n" * self.__number_of_newlines_after_stmt)
+        self.first_statement = False
+        self.reset_statement()
+
+    def finish(self):
+        self.output.drop_tail(self.__number_of_newlines_after_stmt - 1)
+
+    @property
+    def formatted_code(self) -> str:
+        return self.output.getvalue()
+
+    @formatted_code.setter
+    def formatted_code(self, text: str):
+        self.output.clear()
+        self.output.append(text)
 
     def get_formatted_code(self):
-        return self.formatted_code
+        return self.output.getvalue()
+
+
+# Formats the leaves of a statement while the parser matches them, for parsers with
+# buildParseTrees = False. Matched terminals are still attached to their rule context, so the
+# formatter sees the same parents as in a tree, but contexts are dropped once their rule exits.
+# Use it with the stmt start rule: entering the outermost stmt discards the output of an earlier
+# attempt, e.g. the SLL stage of a two-stage parse.
+class ParsingFormatter(ParseTreeListener):
+    def __init__(self, formatter: Formatter):
+        self.formatter = formatter
+        self.first_leaf_pending = True
+
+    def enterStmt(self, ctx: "PostgreSQLParser.StmtContext"):
+        if ctx.parentCtx is None:
+            self.formatter.output.clear()
+            self.formatter.reset_statement()
+            self.first_leaf_pending = True
+
+    def exitStmt(self, ctx: "PostgreSQLParser.StmtContext"):
+        if ctx.parentCtx is None:
+            self.formatter.exitStmt(ctx)
+
+    def visitTerminal(self, node: TerminalNode):
+        if self.first_leaf_pending:
+            self.first_leaf_pending = False
+            self.formatter.begin_statement(node)
+        self.formatter.output.append(self.formatter.format_node(node))
+
+    def visitErrorNode(self, node: ErrorNode):
+        self.visitTerminal(node)
+
+    def exitEveryRule(self, ctx: ParserRuleContext):
+        # a rule that matched nothing is a leaf of the tree too, it may be the first one
+        if self.first_leaf_pending and (ctx.stop is None or ctx.stop.tokenIndex < ctx.start.tokenIndex):
+            self.first_leaf_pending = False
+            self.formatter.begin_statement(ctx)
+
+
+def __non_negative_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
 
 
 def __create_parser():
@@ -372,7 +494,10 @@ def __create_parser():
     )
     parser.add_argument(
         "path",
-        help="Path to the file or directory containing the SQL code to be formatted.",
+        help=(
+            "Path to the file or directory containing the SQL code to be formatted. "
+            "'-' reads SQL from stdin and writes the formatted SQL to stdout."
+        ),
     )
     parser.add_argument(
         "--ugly",
@@ -406,6 +531,89 @@ def __create_parser():
         help="Determines colorama style of the formatted SQL code in terminal. Available options: Style.BRIGHT, Style.DIM, Style.NORMAL",
         action= "store",
     )
+    parser.add_argument(
+        "--prediction-mode",
+        choices=PREDICTION_MODES,
+        default=TWO_STAGE,
+        help=(
+            "ANTLR prediction mode. 'two-stage' parses with fast SLL prediction first "
+            "and reparses with full LL only when SLL fails. (default: two-stage)"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=__non_negative_int,
+        default=1,
+        help=(
+            "Number of worker processes formatting statements in parallel, "
+            "also within a single file. 0 uses all CPUs. (default: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        help=(
+            "Read, format and write one statement at a time, so memory is bounded by the "
+            "largest statement instead of the file size."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--mmap",
+        help=(
+            "Like --stream, but read the input through a memory mapping that is decoded "
+            "window by window, so files larger than the available memory can be formatted."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--statement-cache",
+        choices=("off", "memory", "disk"),
+        default="memory",
+        help=(
+            "Reuse the formatted output of statements seen before instead of parsing them again. "
+            "'disk' also keeps them in the cache directory across runs. (default: memory)"
+        ),
+    )
+    parser.add_argument(
+        "--verbatim-on-error",
+        help=(
+            "Copy statements with syntax errors through unchanged instead of formatting "
+            "a partially parsed statement, and report them."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-statement-tokens",
+        type=int,
+        help="Copy statements with more tokens through unchanged. Implies --verbatim-on-error.",
+    )
+    parser.add_argument(
+        "--max-statement-seconds",
+        type=float,
+        help="Copy statements taking longer to parse through unchanged. Implies --verbatim-on-error.",
+    )
+    parser.add_argument(
+        "--no-parse-trees",
+        help=(
+            "Format statements while they are parsed instead of building a parse tree first, "
+            "so memory is bounded by the nesting depth instead of the statement size."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--force",
+        help="Format all files, also those an earlier run with the same options left formatted.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--refresh-dfa-snapshot",
+        help=(
+            "After formatting, store the prediction DFAs warmed up by this run in the cache, "
+            "so later runs parse at warm speed from the first statement."
+        ),
+        action="store_true",
+    )
 
     return parser
 
@@ -423,39 +631,324 @@ def __get_sql_files_to_format(path: str):
         )
 
 
-def format_sql_file(sql_file_path: Path, ugly: bool = False, newline_after_comma: bool = False, indent: bool = False, max_words_per_line: int = None, terminal_style: str = None):
-    with open(sql_file_path, "r") as file:
-        file_content = file.read()
-    input_stream = InputStream(file_content)
-    lexer = PostgreSQLLexer(input_stream)
-    token_stream = CommonTokenStream(lexer)
-    parser = PostgreSQLParser(token_stream)
+def format_statements(statements, formatter_options: dict, prediction_mode: str = TWO_STAGE, parse_stats: ParseStats = None, memo: StatementMemo = None, budget: ParseBudget = None, parse_trees: bool = True, parser: "PostgreSQLParser" = None, first_statement: bool = True):
+    # Yields every splitter.Statement with its formatted text, statements with COPY data with
+    # several fragments. Every statement is parsed on its own, so a broken one cannot derail the
+    # rest. Statements found in the memo are not parsed.
+    # With a budget, statements with syntax errors or over budget are copied verbatim.
+    # Without parse_trees, statements are formatted by a parse listener while they are parsed.
+    # A given parser is reused, otherwise one is only created once a statement has to be parsed.
+    # Without first_statement, the statements continue an input, e.g. a chunk of a parallel run.
+    listener = Formatter(**formatter_options)
+    if not first_statement:
+        listener.first_statement = False
+        listener.reset_statement()
+    walker = None
+    tree_parser = None
+    # ugly output is random per occurrence, it must not be replayed
+    if formatter_options.get("ugly"):
+        memo = None
+    for statement in statements:
+        first_statement = listener.first_statement
+        # a memoized fragment must not bring back statements the budget copies verbatim
+        if budget is not None and exceeds_token_budget(statement, budget, parse_stats):
+            listener.copy_verbatim(statement.text.strip())
+            yield from _take_fragments(listener, statement)
+            continue
+        # COPY data would keep whole table dumps in memory, those statements are never memoized.
+        # Neither is the first statement, it starts from a state of its own.
+        memoized = memo is not None and statement.data is None and not first_statement
+        if memoized:
+            key = statement_key(statement, formatter_options)
+            fragment = memo.get(key)
+            if fragment is not None:
+                yield statement, fragment
+                continue
+        if parser is None:
+            _, PostgreSQLParser = load_recognizers()
+            parser = PostgreSQLParser(None)
+        if walker is None:
+            walker = SparseParseTreeWalker(parser.ruleNames)
+            if not parse_trees:
+                parser.buildParseTrees = False
+                parser.addParseListener(ParsingFormatter(listener))
+        if budget is None:
+            parser.setTokenStream(statement.token_stream())
+            tree = parse(parser, "stmt", prediction_mode, parse_stats)
+        else:
+            tree = parse_within_budget(parser, statement, budget, prediction_mode, parse_stats)
+            if tree is None:
+                listener.copy_verbatim(statement.text.strip())
+                yield from _take_fragments(listener, statement)
+                continue
+        if parse_trees:
+            listener.output.clear()
+            walker.walk(listener, tree)
+        elif parser.getNumberOfSyntaxErrors():
+            # tokens conjured by error recovery only show up in a tree, the errors are reported already
+            if tree_parser is None:
+                tree_parser = type(parser)(None)
+                tree_parser.removeErrorListeners()
+            listener.first_statement = first_statement
+            _format_with_tree(tree_parser, listener, walker, statement, prediction_mode)
+        # statements with syntax errors are not memoized, the errors are reported every time
+        if memoized and parser.getNumberOfSyntaxErrors() == 0:
+            fragment = listener.output.take()
+            memo.put(key, fragment)
+            yield statement, fragment
+        else:
+            yield from _take_fragments(listener, statement)
+
 
-    tree = parser.root()
+def _take_fragments(listener: Formatter, statement):
+    # a statement with COPY data comes in several fragments: itself, then its data in chunks
+    if statement.data is None:
+        yield statement, listener.output.take()
+    else:
+        for fragment in listener.take_with_copy_data(statement.data):
+            yield statement, fragment
 
-    listener = Formatter(ugly=ugly, newline_after_comma=newline_after_comma, indent=indent, max_words_per_line=max_words_per_line, terminal_style=terminal_style)
 
-    walker = ParseTreeWalker()
+def _format_with_tree(parser, listener: Formatter, walker: SparseParseTreeWalker, statement, prediction_mode: str):
+    # parser builds parse trees and has no listeners
+    parser.setTokenStream(statement.token_stream())
+    tree = parse(parser, "stmt", prediction_mode)
+    listener.output.clear()
+    listener.reset_statement()
     walker.walk(listener, tree)
-    formatted_code = listener.get_formatted_code()
-    with open(sql_file_path, "w") as output:
-        output.write(formatted_code)
-    print(
-        f"{Style.BRIGHT}{Fore.LIGHTWHITE_EX}raccoonified {sql_file_path.name} 🦝🦝🦝{Style.RESET_ALL}"
-    )
+
+
+def format_statement_fragments(lexer, formatter_options: dict, prediction_mode: str = TWO_STAGE, parse_stats: ParseStats = None, memo: StatementMemo = None, budget: ParseBudget = None, parse_trees: bool = True, first_statement: bool = True):
+    for _, fragment in format_statements(split_statements(lexer), formatter_options, prediction_mode, parse_stats, memo, budget, parse_trees, first_statement=first_statement):
+        yield fragment
+
+
+def format_sql_text_fragments(sql_text: str, formatter_options: dict, prediction_mode: str = TWO_STAGE, parse_stats: ParseStats = None, memo: StatementMemo = None, budget: ParseBudget = None, parse_trees: bool = True):
+    PostgreSQLLexer, _ = load_recognizers()
+    return format_statement_fragments(PostgreSQLLexer(CompactInputStream(sql_text)), formatter_options, prediction_mode, parse_stats, memo, budget, parse_trees)
+
+
+def __formatted_pieces(lexer, formatter_options: dict, prediction_mode: str, parse_stats: ParseStats, pool: "StatementPool", memo: StatementMemo, budget: ParseBudget, parse_trees: bool):
+    # the pool's workers do not share the memo
+    if pool is None:
+        fragments = format_statement_fragments(lexer, formatter_options, prediction_mode, parse_stats, memo, budget, parse_trees)
+    else:
+        fragments = pool.format_statements(split_statements(lexer), formatter_options, prediction_mode, parse_stats, budget, parse_trees)
+    yield from finish_fragments(fragments, formatter_options)
+
+
+def finish_fragments(fragments, formatter_options: dict):
+    # the last fragment is held back, Formatter.finish trims the newlines after the last statement
+    last_fragment = ""
+    for fragment in fragments:
+        if last_fragment:
+            yield last_fragment
+        last_fragment = fragment
+    listener = Formatter(**formatter_options)
+    listener.formatted_code = last_fragment
+    listener.finish()
+    yield listener.get_formatted_code()
+
+
+# Formats SQL text in memory. The lexer and parser are created once and reset for every call, so
+# small inputs do not pay for their construction. Not thread-safe, use one per thread.
+class SqlFormatter:
+    def __init__(self, ugly: bool = False, newline_after_comma: bool = False, indent: bool = False, max_words_per_line: int = None, terminal_style: str = None, prediction_mode: str = TWO_STAGE, memo: StatementMemo = None, budget: ParseBudget = None):
+        self.formatter_options = dict(ugly=ugly, newline_after_comma=newline_after_comma, indent=indent, max_words_per_line=max_words_per_line, terminal_style=terminal_style)
+        self.prediction_mode = prediction_mode
+        self.memo = memo
+        self.budget = budget
+        self.parse_stats = ParseStats()
+        PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+        self.lexer = PostgreSQLLexer(None)
+        self.parser = PostgreSQLParser(None)
+
+    def format(self, sql_text: str) -> str:
+        # setting the input stream resets the lexer, the parser is reset with every statement's token stream
+        self.lexer.inputStream = CompactInputStream(sql_text)
+        statements = format_statements(split_statements(self.lexer), self.formatter_options, self.prediction_mode, self.parse_stats, self.memo, self.budget, parser=self.parser)
+        return "".join(finish_fragments((fragment for _, fragment in statements), self.formatter_options))
+
+
+def format_sql(sql_text: str, **options) -> str:
+    # options are those of SqlFormatter, keep a SqlFormatter around to format many texts
+    return SqlFormatter(**options).format(sql_text)
+
+
+def format_sql_stream(reader: TextIO, ugly: bool = False, newline_after_comma: bool = False, indent: bool = False, max_words_per_line: int = None, terminal_style: str = None, prediction_mode: str = TWO_STAGE, parse_stats: ParseStats = None, pool: "StatementPool" = None, memo: StatementMemo = None, budget: ParseBudget = None, parse_trees: bool = True):
+    # Reads SQL from reader incrementally and yields the formatted code statement by statement,
+    # so memory is bounded by the largest statement instead of the input.
+    PostgreSQLLexer, _ = load_recognizers()
+    lexer = PostgreSQLLexer(UnbufferedCharStream(reader, name=getattr(reader, "name", "<stream>")))
+    lexer._factory = CommonTokenFactory(copyText=True)
+    formatter_options = dict(ugly=ugly, newline_after_comma=newline_after_comma, indent=indent, max_words_per_line=max_words_per_line, terminal_style=terminal_style)
+    yield from __formatted_pieces(lexer, formatter_options, prediction_mode, parse_stats, pool, memo, budget, parse_trees)
+
+
+def format_sql_file(sql_file_path: Path, ugly: bool = False, newline_after_comma: bool = False, indent: bool = False, max_words_per_line: int = None, terminal_style: str = None, prediction_mode: str = TWO_STAGE, parse_stats: ParseStats = None, pool: "StatementPool" = None, stream: bool = False, memo: StatementMemo = None, budget: ParseBudget = None, parse_trees: bool = True, mapped: bool = False):
+    # Returns whether the file changed. Output goes to a temporary file next to the input, which
+    # replaces it once complete, so a crash cannot truncate the input. Unchanged files are not
+    # written at all, their mtime stays.
+    if stream or mapped:
+        with MappedTextReader(sql_file_path) if mapped else open(sql_file_path, "r") as file:
+            output_path = _write_temporary(sql_file_path, format_sql_stream(file, ugly=ugly, newline_after_comma=newline_after_comma, indent=indent, max_words_per_line=max_words_per_line, terminal_style=terminal_style, prediction_mode=prediction_mode, parse_stats=parse_stats, pool=pool, memo=memo, budget=budget, parse_trees=parse_trees))
+        changed = not filecmp.cmp(sql_file_path, output_path, shallow=False)
+        if changed:
+            _replace(sql_file_path, output_path)
+        else:
+            os.unlink(output_path)
+    else:
+        with open(sql_file_path, "r") as file:
+            file_content = file.read()
+            # text mode translated any other line endings, writing back would change them
+            newlines = file.newlines
+        formatter_options = dict(ugly=ugly, newline_after_comma=newline_after_comma, indent=indent, max_words_per_line=max_words_per_line, terminal_style=terminal_style)
+        PostgreSQLLexer, _ = load_recognizers()
+        lexer = PostgreSQLLexer(CompactInputStream(file_content))
+        formatted_code = OutputBuffer()
+        for piece in __formatted_pieces(lexer, formatter_options, prediction_mode, parse_stats, pool, memo, budget, parse_trees):
+            formatted_code.append(piece)
+        changed = formatted_code.getvalue() != file_content or newlines not in (None, "\n")
+        if changed:
+            _replace(sql_file_path, _write_temporary(sql_file_path, formatted_code.chunks))
+    if changed:
+        print(
+            f"{Style.BRIGHT}{Fore.LIGHTWHITE_EX}raccoonified {sql_file_path.name} 🦝🦝🦝{Style.RESET_ALL}"
+        )
+    else:
+        print(f"{Style.DIM}{sql_file_path.name} was already polished 🦝{Style.RESET_ALL}")
+    return changed
+
+
+def _write_temporary(sql_file_path: Path, pieces) -> str:
+    # next to the target of a symlink, so replacing it stays on one file system
+    target = Path(sql_file_path).resolve()
+    with tempfile.NamedTemporaryFile(
+            "w", dir=target.parent, prefix=target.name, suffix=".tmp", delete=False
+    ) as output:
+        try:
+            output.writelines(pieces)
+        except BaseException:
+            output.close()
+            os.unlink(output.name)
+            raise
+    return output.name
+
+
+def _replace(sql_file_path: Path, output_path: str):
+    # a symlink stays in place, its target gets the formatted content
+    target = Path(sql_file_path).resolve()
+    shutil.copymode(target, output_path)
+    os.replace(output_path, target)
+
+
+def __format_stdin(args, parse_stats: ParseStats, pool: "StatementPool", memo: StatementMemo, budget: ParseBudget):
+    # every statement is written as soon as it is formatted, so the tool can sit in a pipeline
+    pieces = format_sql_stream(sys.stdin, ugly=args.ugly, newline_after_comma=args.newline_after_comma, indent=args.indent, max_words_per_line=args.max_words_per_line, prediction_mode=args.prediction_mode, parse_stats=parse_stats, pool=pool, memo=memo, budget=budget, parse_trees=not args.no_parse_trees)
+    try:
+        for piece in pieces:
+            sys.stdout.write(piece)
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # the reader went away, e.g. head; stdout is redirected so the flush at exit cannot fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+def __refresh_dfa_snapshot(messages: TextIO):
+    from raccoon_sql_polisher.cache import save_dfa_snapshot
+
+    for recognizer_class in load_recognizers():
+        if save_dfa_snapshot(recognizer_class) is None:
+            print(
+                f"{Style.BRIGHT}{Fore.LIGHTYELLOW_EX}caching is disabled, DFA snapshot not saved 💀{Style.RESET_ALL}",
+                file=messages,
+            )
+            return
+    print(f"{Style.BRIGHT}{Fore.LIGHTWHITE_EX}DFA snapshot refreshed 🦝{Style.RESET_ALL}", file=messages)
 
 
 def main():
-    init()
     parser = __create_parser()
     args = parser.parse_args()
-
-    sql_files = __get_sql_files_to_format(args.path)
-    for file in sql_files:
-        format_sql_file(file, ugly= args.ugly,
-                        newline_after_comma=args.newline_after_comma,
-                        indent=args.indent,
-                        max_words_per_line=args.max_words_per_line)
+    from_stdin = args.path == STDIN_PATH
+    # formatted SQL on stdout must not pass through colorama, it could strip escape sequences
+    init(wrap=not from_stdin)
+    # with SQL on stdout, messages go to stderr
+    messages = sys.stderr if from_stdin else sys.stdout
+
+    sql_files = [] if from_stdin else __get_sql_files_to_format(args.path)
+    parse_stats = ParseStats()
+    # DFAs warmed up in worker processes cannot be snapshotted, so refreshing runs in-process
+    pool = None
+    if args.jobs != 1 and (sql_files or from_stdin) and not args.refresh_dfa_snapshot:
+        from raccoon_sql_polisher.parallel import StatementPool
+
+        pool = StatementPool(args.jobs)
+    budget = None
+    if args.verbatim_on_error or args.max_statement_tokens is not None or args.max_statement_seconds is not None:
+        budget = ParseBudget(args.max_statement_tokens, args.max_statement_seconds)
+    memo = None
+    if args.statement_cache != "off":
+        memo = StatementMemo(disk=args.statement_cache == "disk")
+    # Files left formatted by an earlier run with the same output settings are skipped, unless
+    # DFAs have to be warmed up. Random case output is never in a final state.
+    file_cache = None
+    if not args.force and not args.refresh_dfa_snapshot and not from_stdin and not args.ugly:
+        file_cache = FileCache(dict(
+            newline_after_comma=args.newline_after_comma,
+            indent=args.indent,
+            max_words_per_line=args.max_words_per_line,
+            # statements copied verbatim depend on the budget
+            budget=None if budget is None else (budget.max_tokens, budget.max_seconds),
+        ))
+    changed_files = unchanged_files = 0
+    try:
+        if from_stdin:
+            __format_stdin(args, parse_stats, pool, memo, budget)
+            for diagnostic in parse_stats.diagnostics:
+                print(f"{Fore.YELLOW}<stdin>: {diagnostic}{Style.RESET_ALL}", file=sys.stderr)
+        for file in sql_files:
+            if file_cache is not None and file_cache.is_formatted(file):
+                continue
+            diagnostics = len(parse_stats.diagnostics)
+            changed = format_sql_file(file, ugly= args.ugly,
+                                      newline_after_comma=args.newline_after_comma,
+                                      indent=args.indent,
+                                      max_words_per_line=args.max_words_per_line,
+                                      prediction_mode=args.prediction_mode,
+                                      parse_stats=parse_stats,
+                                      pool=pool,
+                                      stream=args.stream,
+                                      memo=memo,
+                                      budget=budget,
+                                      parse_trees=not args.no_parse_trees,
+                                      mapped=args.mmap)
+            if changed:
+                changed_files += 1
+            else:
+                unchanged_files += 1
+            for diagnostic in parse_stats.diagnostics[diagnostics:]:
+                print(f"{Fore.YELLOW}{file}: {diagnostic}{Style.RESET_ALL}", file=sys.stderr)
+            if file_cache is not None:
+                file_cache.record(file)
+    finally:
+        if file_cache is not None:
+            file_cache.save()
+        if pool is not None:
+            pool.close()
+        if memo is not None:
+            memo.close()
+    if changed_files + unchanged_files:
+        print(f"{Style.DIM}{changed_files} files changed, {unchanged_files} unchanged{Style.RESET_ALL}")
+    if args.prediction_mode == TWO_STAGE and parse_stats.parses:
+        print(f"{Style.DIM}{parse_stats.summary()}{Style.RESET_ALL}", file=messages)
+    if file_cache is not None and file_cache.skipped:
+        print(f"{Style.DIM}skipped {file_cache.skipped} already formatted files{Style.RESET_ALL}")
+    if memo is not None and pool is None and memo.hits + memo.disk_hits + memo.misses:
+        print(f"{Style.DIM}{memo.summary()}{Style.RESET_ALL}", file=messages)
+    if args.refresh_dfa_snapshot:
+        __refresh_dfa_snapshot(messages)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import io
+from bisect import bisect_left
+from itertools import groupby
+from operator import itemgetter
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from raccoon_sql_polisher.formatter import finish_fragments, format_statements
+from raccoon_sql_polisher.parsing import TWO_STAGE, ParseBudget, ParseStats, load_recognizers
+from raccoon_sql_polisher.splitter import split_statements
+from raccoon_sql_polisher.streams import UnbufferedCharStream
+
+
+def _common_prefix(a: str, b: str) -> int:
+    # binary search with slice comparisons, so long buffers are compared at C speed
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+# Formats a buffer that is edited over time, e.g. by an editor sending the whole buffer on every
+# request. The end offset and formatted text of every statement are kept, and an update only
+# reparses the statements from the one containing the change up to the first statement
+# boundary behind it that also was a boundary before. The rest is spliced in from the cache.
+# Lexing restarts at a statement boundary, where the lexer is back in its default mode.
+class IncrementalFormatter:
+    def __init__(self, ugly: bool = False, newline_after_comma: bool = False, indent: bool = False, max_words_per_line: int = None, terminal_style: str = None, prediction_mode: str = TWO_STAGE, budget: ParseBudget = None):
+        self.formatter_options = dict(ugly=ugly, newline_after_comma=newline_after_comma, indent=indent, max_words_per_line=max_words_per_line, terminal_style=terminal_style)
+        self.prediction_mode = prediction_mode
+        self.budget = budget
+        self.parse_stats = ParseStats()
+        self.text = ""
+        self.formatted_code = ""
+        # statements parsed by the last update
+        self.reparsed = 0
+        self._ends = []
+        self._fragments = []
+
+    def format(self, text: str) -> str:
+        # diffs the new buffer against the previous one
+        prefix = _common_prefix(self.text, text)
+        suffix = _common_suffix(self.text, text, min(len(self.text), len(text)) - prefix)
+        return self._update(text, prefix, len(text) - suffix)
+
+    def edit(self, start: int, end: int, replacement: str) -> str:
+        # replaces self.text[start:end] with replacement
+        text = self.text[:start] + replacement + self.text[end:]
+        return self._update(text, start, start + len(replacement))
+
+    def _update(self, text: str, change_start: int, change_end: int) -> str:
+        # text[change_start:change_end] replaced the changed part of self.text
+        delta = len(text) - len(self.text)
+        kept = bisect_left(self._ends, change_start)
+        restart = self._ends[kept - 1] if kept else 0
+
+        PostgreSQLLexer, _ = load_recognizers()
+        lexer = PostgreSQLLexer(UnbufferedCharStream(io.StringIO(text[restart:])))
+        lexer._factory = CommonTokenFactory(copyText=True)
+        lexer.line = text.count("\n", 0, restart) + 1
+
+        ends, fragments = [], []
+        resume = len(self._ends)
+        statements = format_statements(split_statements(lexer), self.formatter_options, self.prediction_mode, self.parse_stats, budget=self.budget, first_statement=restart == 0)
+        # a statement with COPY data comes in several fragments
+        for statement, pieces in groupby(statements, key=itemgetter(0)):
+            fragments.append("".join(fragment for _, fragment in pieces))
+            end = restart + statement.start + statement.length
+            ends.append(end)
+            if end >= change_end:
+                # the rest of the text is unchanged, so is everything behind a boundary both share
+                old_end = end - delta
+                index = bisect_left(self._ends, old_end)
+                if index < len(self._ends) and self._ends[index] == old_end:
+                    resume = index + 1
+                    break
+
+        self._ends[kept:] = ends + [end + delta for end in self._ends[resume:]]
+        self._fragments[kept:] = fragments + self._fragments[resume:]
+        self.reparsed = len(ends)
+        self.text = text
+        self.formatted_code = "".join(finish_fragments(self._fragments, self.formatter_options))
+        return self.formatted_code
@@ -52,6 +52,11 @@ class PostgreSQLLexerBase(Lexer):
         super().__init__(input, output)
         self.tags = []
 
+    def reset(self):
+        super().reset()
+        # tags of an unterminated dollar-quoted body must not leak into the next input
+        self.tags = []
+
     def PushTag(self):
         self.tags.append(self.text)
 
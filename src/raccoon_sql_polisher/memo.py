@@ -0,0 +1,136 @@
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from antlr4 import Token
+from raccoon_sql_polisher.cache import get_cache_dir
+from raccoon_sql_polisher.filecache import tool_fingerprint
+
+MEMO_FORMAT_VERSION = 1
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+
+
+def memo_path() -> Path | None:
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+    return cache_dir / "statements.sqlite3"
+
+
+def statement_key(statement, formatter_options: dict) -> str:
+    # The formatter only sees the parse tree, so whitespace and comments cannot change the
+    # output: the key covers the default channel tokens and the options. Statements with
+    # COPY data are not memoized.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((MEMO_FORMAT_VERSION, sorted(formatter_options.items()))).encode())
+    for token in statement.tokens:
+        if token.channel == Token.DEFAULT_CHANNEL:
+            digest.update(b"\0%d\0" % token.type)
+            digest.update(token.text.encode())
+    return digest.hexdigest()
+
+
+# Formatted statements by statement_key, so repeated statements are formatted without parsing.
+# Recently used entries are kept in memory. With a disk tier, misses are looked up in an SQLite
+# database in the cache directory; new entries and last-use times are written when the memo is
+# closed, evicting the least recently used entries beyond max_disk_bytes. Entries written by
+# another version of the tool are dropped when the database is opened.
+class StatementMemo:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, disk: bool = False, max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES, path: Path = None):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._new_entries = {}
+        self._used_keys = set()
+        self._connection = None
+        if disk:
+            path = path or memo_path()
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(path)
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, fragment TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+                )
+                self._check_tool()
+        self.disk = self._connection is not None
+
+    def _check_tool(self):
+        fingerprint = tool_fingerprint()
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS tool (fingerprint TEXT NOT NULL)")
+            row = self._connection.execute("SELECT fingerprint FROM tool").fetchone()
+            if row is None or row[0] != fingerprint:
+                self._connection.execute("DELETE FROM memo")
+                self._connection.execute("DELETE FROM tool")
+                self._connection.execute("INSERT INTO tool VALUES (?)", (fingerprint,))
+
+    def get(self, key: str) -> str | None:
+        fragment = self._entries.get(key)
+        if fragment is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+        if self._connection is not None:
+            row = self._connection.execute("SELECT fragment FROM memo WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                self._used_keys.add(key)
+                self._remember(key, row[0])
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, fragment: str):
+        self._remember(key, fragment)
+        if self._connection is not None:
+            self._new_entries[key] = fragment
+
+    def _remember(self, key: str, fragment: str):
+        self._entries[key] = fragment
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def summary(self) -> str:
+        lookups = self.hits + self.disk_hits + self.misses
+        rate = (self.hits + self.disk_hits) / lookups * 100 if lookups else 0
+        summary = f"statement cache hit rate {rate:.1f}% ({self.hits} memory"
+        if self.disk:
+            summary += f", {self.disk_hits} disk"
+        return summary + f" hits of {lookups} statements)"
+
+    def close(self):
+        if self._connection is None:
+            return
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?)",
+                ((key, fragment, len(fragment.encode()), now) for key, fragment in self._new_entries.items()),
+            )
+            self._connection.executemany("UPDATE memo SET used = ? WHERE key = ?", ((now, key) for key in self._used_keys))
+            self._evict()
+        self._connection.close()
+        self._connection = None
+
+    def _evict(self):
+        (total_size,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM memo").fetchone()
+        if total_size <= self.max_disk_bytes:
+            return
+        evicted = []
+        for key, size in self._connection.execute("SELECT key, size FROM memo ORDER BY used"):
+            if total_size <= self.max_disk_bytes:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self._connection.executemany("DELETE FROM memo WHERE key = ?", evicted)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
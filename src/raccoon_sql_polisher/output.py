@@ -0,0 +1,62 @@
+from typing import TextIO
+
+
+# Text assembled from appended chunks. Joining happens once, when the text is taken or
+# flushed, so building it is linear in its length. Only the tail can be changed, which
+# is all the formatter needs at the end of a statement.
+class OutputBuffer:
+    def __init__(self):
+        self.chunks = []
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, text: str):
+        if text:
+            self.chunks.append(text)
+            self.length += len(text)
+
+    def tail(self, size: int) -> str:
+        # the last size characters, joining only as many chunks as needed
+        parts = []
+        collected = 0
+        for chunk in reversed(self.chunks):
+            if collected >= size:
+                break
+            parts.append(chunk)
+            collected += len(chunk)
+        text = "".join(reversed(parts))
+        return text[len(text) - min(size, len(text)):]
+
+    def drop_tail(self, size: int):
+        size = min(size, self.length)
+        self.length -= size
+        while size:
+            chunk = self.chunks.pop()
+            if len(chunk) > size:
+                self.chunks.append(chunk[: len(chunk) - size])
+                break
+            size -= len(chunk)
+
+    def replace_tail(self, size: int, text: str):
+        self.drop_tail(size)
+        self.append(text)
+
+    def getvalue(self) -> str:
+        if len(self.chunks) > 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+
+    def clear(self):
+        self.chunks = []
+        self.length = 0
+
+    def take(self) -> str:
+        text = self.getvalue()
+        self.clear()
+        return text
+
+    def flush(self, sink: TextIO):
+        sink.writelines(self.chunks)
+        self.clear()
@@ -0,0 +1,82 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from raccoon_sql_polisher.parsing import TWO_STAGE, ParseBudget, ParseStats, load_recognizers
+
+DEFAULT_CHUNK_SIZE = 64
+
+
+def _warm_worker():
+    # loads the recognizers (and their cached ATN / DFA snapshot) once per worker process
+    load_recognizers()
+
+
+def _format_chunk(statements: list[tuple[int, str]], formatter_options: dict, prediction_mode: str, budget: ParseBudget, parse_trees: bool, first_chunk: bool):
+    from raccoon_sql_polisher.formatter import format_statement_fragments
+    from raccoon_sql_polisher.streams import CompactInputStream
+
+    # every statement is lexed from its first line, so diagnostics point into the original input
+    PostgreSQLLexer, _ = load_recognizers()
+    stats = ParseStats()
+    fragments = []
+    for index, (line, text) in enumerate(statements):
+        lexer = PostgreSQLLexer(CompactInputStream(text))
+        lexer.line = line
+        first_statement = first_chunk and index == 0
+        fragments += format_statement_fragments(lexer, formatter_options, prediction_mode, stats, budget=budget, parse_trees=parse_trees, first_statement=first_statement)
+    return fragments, stats.parses, stats.ll_fallbacks, stats.diagnostics
+
+
+def _chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# Process pool that formats the statements of a single file in parallel. Statements go to
+# warmed workers in chunks and the formatted fragments come back in the original order.
+# Only a few chunks per worker are in flight, so memory stays bounded for huge inputs.
+class StatementPool:
+    def __init__(self, jobs: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_warm_worker)
+
+    def format_statements(self, statements, formatter_options: dict,
+                          prediction_mode: str = TWO_STAGE, parse_stats: ParseStats = None,
+                          budget: ParseBudget = None, parse_trees: bool = True):
+        # statements are splitter.Statement objects, the workers get their first line and text,
+        # COPY data included as a whole
+        in_flight = deque()
+        max_in_flight = self.jobs * 2
+        texts = (
+            (statement.tokens[0].line, statement.text + (statement.data.read() if statement.data is not None else ""))
+            for statement in statements
+        )
+        for index, chunk in enumerate(_chunks(texts, self.chunk_size)):
+            in_flight.append(
+                self.executor.submit(_format_chunk, chunk, formatter_options, prediction_mode, budget, parse_trees, index == 0)
+            )
+            if len(in_flight) >= max_in_flight:
+                yield from self._collect(in_flight.popleft(), parse_stats)
+        while in_flight:
+            yield from self._collect(in_flight.popleft(), parse_stats)
+
+    @staticmethod
+    def _collect(future, parse_stats: ParseStats):
+        fragments, parses, ll_fallbacks, diagnostics = future.result()
+        if parse_stats is not None:
+            parse_stats.parses += parses
+            parse_stats.ll_fallbacks += ll_fallbacks
+            parse_stats.diagnostics += diagnostics
+        return fragments
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -5,6 +5,12 @@ if __name__ is not None and "." in __name__:
     relativeImport = True
 
 class PostgreSQLParserBase(Parser):
+    def setTrace(self, trace: bool):
+        # Parser.reset calls setTrace(False), which removes the tracer even when there is none
+        # and then fails once parse listeners are attached
+        if trace or self._tracer is not None:
+            super().setTrace(trace)
+
     def ParseRoutineBody(self):
         return
 
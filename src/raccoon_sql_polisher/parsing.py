@@ -0,0 +1,200 @@
+import time
+from antlr4 import BailErrorStrategy, CommonTokenStream, PredictionMode, Token
+from antlr4.ListTokenSource import ListTokenSource
+from antlr4.error.ErrorStrategy import DefaultErrorStrategy
+from antlr4.error.Errors import InputMismatchException, ParseCancellationException
+
+SLL = "sll"
+LL = "ll"
+TWO_STAGE = "two-stage"
+PREDICTION_MODES = (SLL, LL, TWO_STAGE)
+
+
+# The generated lexer and parser take most of the startup time, so they are only
+# imported once something actually has to be parsed.
+def load_recognizers():
+    from raccoon_sql_polisher.lexer.PostgreSQLLexer import PostgreSQLLexer
+    from raccoon_sql_polisher.parser.PostgreSQLParser import PostgreSQLParser
+
+    return PostgreSQLLexer, PostgreSQLParser
+
+
+class Diagnostic:
+    def __init__(self, line: int, column: int, message: str):
+        self.line = line
+        self.column = column
+        self.message = message
+
+    def __str__(self):
+        return f"line {self.line}:{self.column} {self.message}, statement copied verbatim"
+
+
+class ParseStats:
+    def __init__(self):
+        self.parses = 0
+        self.ll_fallbacks = 0
+        # statements that were copied verbatim because they could not be parsed within the budget
+        self.diagnostics = []
+
+    def summary(self) -> str:
+        return f"SLL parse fell back to full LL for {self.ll_fallbacks} of {self.parses} statements"
+
+
+def parse(parser, rule: str = "root", prediction_mode: str = TWO_STAGE, stats: ParseStats = None, bail_out: bool = False):
+    # In two-stage mode the input is first parsed with the cheaper SLL prediction and a
+    # bail-out error strategy, and only reparsed with full LL when that fails.
+    # With bail_out, syntax errors are not reported and recovered from, they raise
+    # ParseCancellationException.
+    if prediction_mode not in PREDICTION_MODES:
+        raise ValueError(
+            f"Invalid prediction mode {prediction_mode!r}. Must be one of {', '.join(PREDICTION_MODES)}."
+        )
+    if stats is not None:
+        stats.parses += 1
+    start_rule = getattr(parser, rule)
+    if bail_out:
+        return _parse_or_bail_out(parser, start_rule, prediction_mode, stats)
+
+    if prediction_mode == LL:
+        parser._interp.predictionMode = PredictionMode.LL
+        return _check_eof(parser, start_rule())
+    parser._interp.predictionMode = PredictionMode.SLL
+    if prediction_mode == SLL:
+        return _check_eof(parser, start_rule())
+
+    error_listeners = parser._listeners
+    parser._errHandler = BailErrorStrategy()
+    parser.removeErrorListeners()
+    try:
+        tree = start_rule()
+        if _at_eof(parser):
+            return tree
+    except ParseCancellationException:
+        pass
+    finally:
+        parser._listeners = error_listeners
+        parser._errHandler = DefaultErrorStrategy()
+
+    # SLL may reject valid input, only full LL decides whether it really is a syntax error
+    if stats is not None:
+        stats.ll_fallbacks += 1
+    parser.reset()
+    parser._interp.predictionMode = PredictionMode.LL
+    return _check_eof(parser, start_rule())
+
+
+def _parse_or_bail_out(parser, start_rule, prediction_mode: str, stats: ParseStats):
+    error_listeners = parser._listeners
+    parser._errHandler = BailErrorStrategy()
+    parser.removeErrorListeners()
+    try:
+        if prediction_mode != LL:
+            parser._interp.predictionMode = PredictionMode.SLL
+            try:
+                tree = start_rule()
+                if _at_eof(parser):
+                    return tree
+                if prediction_mode == SLL:
+                    raise ParseCancellationException(InputMismatchException(parser))
+            except ParseCancellationException:
+                if prediction_mode == SLL:
+                    raise
+            if stats is not None:
+                stats.ll_fallbacks += 1
+            parser.reset()
+        parser._interp.predictionMode = PredictionMode.LL
+        tree = start_rule()
+        if not _at_eof(parser):
+            raise ParseCancellationException(InputMismatchException(parser))
+        return tree
+    finally:
+        parser._listeners = error_listeners
+        parser._errHandler = DefaultErrorStrategy()
+
+
+def _at_eof(parser) -> bool:
+    return parser.getTokenStream().LA(1) == Token.EOF
+
+
+def _check_eof(parser, tree):
+    # rules other than root do not end in EOF, trailing input is reported like any syntax error
+    if not _at_eof(parser):
+        token = parser.getCurrentToken()
+        parser.notifyErrorListeners(f"extraneous input {token.text!r} expecting <EOF>", token, None)
+    return tree
+
+
+def parse_statements(statements, prediction_mode: str = TWO_STAGE, stats: ParseStats = None):
+    # Parses every splitter.Statement on its own with the stmt rule, reusing one parser.
+    _, PostgreSQLParser = load_recognizers()
+    parser = PostgreSQLParser(None)
+    for statement in statements:
+        parser.setTokenStream(statement.token_stream())
+        yield statement, parse(parser, "stmt", prediction_mode, stats)
+
+
+class ParseBudgetExceeded(Exception):
+    pass
+
+
+class ParseBudget:
+    # Limits for parsing one statement. A statement with more than max_tokens tokens is not
+    # parsed at all, one taking longer than max_seconds is abandoned.
+    def __init__(self, max_tokens: int = None, max_seconds: float = None):
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+
+
+class BudgetTokenStream(CommonTokenStream):
+    # Checks the deadline while tokens are consumed, which also happens during prediction
+    # lookahead, so parses stuck in ambiguous prediction are cut off as well.
+    CHECK_INTERVAL = 32
+
+    def __init__(self, tokens: list, deadline: float):
+        super().__init__(ListTokenSource(tokens))
+        self.deadline = deadline
+        self.countdown = self.CHECK_INTERVAL
+
+    def consume(self):
+        super().consume()
+        self.countdown -= 1
+        if not self.countdown:
+            self.countdown = self.CHECK_INTERVAL
+            if time.perf_counter() > self.deadline:
+                raise ParseBudgetExceeded()
+
+
+def exceeds_token_budget(statement, budget: ParseBudget, stats: ParseStats = None) -> bool:
+    # Records a Diagnostic for a splitter.Statement with more tokens than the budget allows.
+    # Checked before anything else, the outcome only depends on the statement.
+    if budget.max_tokens is None:
+        return False
+    tokens = [token for token in statement.tokens if token.channel == Token.DEFAULT_CHANNEL]
+    if len(tokens) <= budget.max_tokens:
+        return False
+    _diagnose(stats, tokens[0], f"statement has {len(tokens)} tokens, the budget is {budget.max_tokens}")
+    return True
+
+
+def parse_within_budget(parser, statement, budget: ParseBudget, prediction_mode: str = TWO_STAGE, stats: ParseStats = None):
+    # Parses a splitter.Statement with the stmt rule. Returns None and records a Diagnostic
+    # when the statement has a syntax error or takes longer than the budget. Check
+    # exceeds_token_budget first.
+    first_token = next(token for token in statement.tokens if token.channel == Token.DEFAULT_CHANNEL)
+    if budget.max_seconds is not None:
+        parser.setTokenStream(BudgetTokenStream(statement.tokens, time.perf_counter() + budget.max_seconds))
+    else:
+        parser.setTokenStream(statement.token_stream())
+    try:
+        return parse(parser, "stmt", prediction_mode, stats, bail_out=True)
+    except ParseCancellationException as e:
+        token = e.args[0].offendingToken if e.args and e.args[0] is not None else first_token
+        _diagnose(stats, token, f"syntax error at {token.text!r}")
+    except ParseBudgetExceeded:
+        _diagnose(stats, first_token, f"parsing took longer than {budget.max_seconds:g} s")
+    return None
+
+
+def _diagnose(stats: ParseStats, token, message: str):
+    if stats is not None:
+        stats.diagnostics.append(Diagnostic(token.line, token.column, message))
@@ -0,0 +1,80 @@
+from enum import Enum
+
+
+class NodeType(Enum):
+    KEYWORD = "Keyword"
+    REGULAR = "Regular"
+    DOT = "Dot"
+    COMMA = "Comma"
+    LEFT_PARENTHESIS = "Left parenthesis"
+    RIGHT_PARENTHESIS = "Right parenthesis"
+    STRING = "String"
+
+
+# Codes of the leaf being formatted: the node types plus the VALUES keyword, which starts a line
+# of its own. The previous leaf is coded the same way, with no previous leaf in place of VALUES.
+NODE_CODES = {node_type: code for code, node_type in enumerate(NodeType)}
+VALUES_KEYWORD = len(NODE_CODES)
+PREVIOUS_CODES = {**NODE_CODES, None: VALUES_KEYWORD}
+NUMBER_OF_CODES = VALUES_KEYWORD + 1
+
+# State flags, the table has one row per combination
+COLUMN_CONSTRAINTS = 8  # inside the column list of CREATE TABLE
+CREATE_TABLE = 4  # in a statement starting with CREATE
+COMMA_NEWLINE = 2  # newline_after_comma inside a SELECT clause
+INDENT_AFTER_KEYWORD = 1
+NUMBER_OF_STATES = 16
+
+KEEP, UPPER, LOWER = str, str.upper, str.lower
+ANY = None
+
+# First matching rule wins:
+# (required state flags, excluded state flags, previous leaves, leaves, (prefix, case, suffix, enters column constraints))
+SPACING_RULES = (
+    (0, COLUMN_CONSTRAINTS, ANY, (VALUES_KEYWORD,), ("\n", UPPER, " ", False)),
+    (0, COLUMN_CONSTRAINTS, (None,), (NodeType.KEYWORD,), ("", UPPER, "", False)),
+    (0, COLUMN_CONSTRAINTS, (NodeType.REGULAR, NodeType.STRING), (NodeType.KEYWORD,), ("\n", UPPER, "", False)),
+    (0, COLUMN_CONSTRAINTS, ANY, (NodeType.KEYWORD,), (" ", UPPER, "", False)),
+    (COMMA_NEWLINE, COLUMN_CONSTRAINTS, ANY, (NodeType.COMMA,), ("", KEEP, "\n", False)),
+    (CREATE_TABLE, COLUMN_CONSTRAINTS, ANY, (NodeType.LEFT_PARENTHESIS,), (" ", KEEP, "\n", True)),
+    (0, COLUMN_CONSTRAINTS, (NodeType.KEYWORD,), (NodeType.LEFT_PARENTHESIS,), ("", KEEP, "", False)),
+    (0, COLUMN_CONSTRAINTS, ANY, (NodeType.LEFT_PARENTHESIS,), (" ", KEEP, "", False)),
+    (0, COLUMN_CONSTRAINTS, (NodeType.LEFT_PARENTHESIS,), (NodeType.STRING,), ("", KEEP, "", False)),
+    (0, COLUMN_CONSTRAINTS, ANY, (NodeType.STRING,), (" ", KEEP, "", False)),
+    (0, COLUMN_CONSTRAINTS, (NodeType.DOT, NodeType.LEFT_PARENTHESIS), (NodeType.REGULAR,), ("", LOWER, "", False)),
+    (INDENT_AFTER_KEYWORD, COLUMN_CONSTRAINTS, (NodeType.KEYWORD,), (NodeType.REGULAR,), ("\n\t", LOWER, "", False)),
+    (0, COLUMN_CONSTRAINTS, ANY, (NodeType.REGULAR,), (" ", LOWER, "", False)),
+    (COLUMN_CONSTRAINTS, 0, (NodeType.LEFT_PARENTHESIS,), (NodeType.REGULAR,), ("", LOWER, "", False)),
+    (COLUMN_CONSTRAINTS, 0, (NodeType.REGULAR, NodeType.KEYWORD), (NodeType.REGULAR,), (" ", LOWER, "", False)),
+    (COLUMN_CONSTRAINTS, 0, (NodeType.COMMA,), (NodeType.REGULAR,), ("\n", LOWER, "", False)),
+    (COLUMN_CONSTRAINTS, 0, ANY, (NodeType.REGULAR,), ("", LOWER, "", False)),
+    (COLUMN_CONSTRAINTS, 0, ANY, (NodeType.KEYWORD, VALUES_KEYWORD), (" ", UPPER, "", False)),
+    (COLUMN_CONSTRAINTS, 0, ANY, (NodeType.STRING,), (" ", KEEP, "", False)),
+)
+# leaves no rule matches are kept as they are
+NO_SPACING = ("", KEEP, "", False)
+
+
+def _code(leaf) -> int:
+    return leaf if leaf == VALUES_KEYWORD else NODE_CODES[leaf]
+
+
+def compile_spacing_rules(rules: tuple = SPACING_RULES) -> tuple:
+    # Flattens the rules into one tuple indexed by spacing_index
+    table = [None] * (NUMBER_OF_STATES * NUMBER_OF_CODES * NUMBER_OF_CODES)
+    for required, excluded, previous_leaves, leaves, spacing in reversed(rules):
+        for state in range(NUMBER_OF_STATES):
+            if state & required != required or state & excluded:
+                continue
+            previous_codes = range(NUMBER_OF_CODES) if previous_leaves is ANY else [PREVIOUS_CODES[leaf] for leaf in previous_leaves]
+            for previous_code in previous_codes:
+                for leaf in leaves:
+                    table[spacing_index(state, previous_code, _code(leaf))] = spacing
+    return tuple(NO_SPACING if spacing is None else spacing for spacing in table)
+
+
+def spacing_index(state: int, previous_code: int, code: int) -> int:
+    return (state * NUMBER_OF_CODES + previous_code) * NUMBER_OF_CODES + code
+
+
+SPACING_TABLE = compile_spacing_rules()
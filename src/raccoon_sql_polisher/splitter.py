@@ -0,0 +1,151 @@
+from antlr4 import CommonTokenStream, Token
+from antlr4.ListTokenSource import ListTokenSource
+
+# psql ends the data of COPY ... FROM stdin with a line containing only this
+COPY_DATA_END = "\\."
+
+
+# COPY data is read from the char stream in chunks of this many characters
+COPY_DATA_CHUNK_SIZE = 64 * 1024
+# the end marker line is recognized in the text behind a chunk: "\n\\." and a line break
+_MARKER = "\n" + COPY_DATA_END
+_LOOKAHEAD = len(_MARKER) + 2
+
+
+class CopyData:
+    # The input after the semicolon of COPY ... FROM stdin up to and including the end marker
+    # line, it is never lexed or parsed. Iterating yields it in chunks read from the char stream
+    # and moves the lexer behind every chunk, so a table dump is never held in memory as a
+    # whole. It can be read once, split_statements skips what is left of it.
+    def __init__(self, lexer):
+        self.length = 0
+        self._chunks = self._read_chunks(lexer)
+
+    def __iter__(self):
+        return self._chunks
+
+    def read(self) -> str:
+        return "".join(self._chunks)
+
+    def skip(self):
+        for _ in self._chunks:
+            pass
+
+    def _read_chunks(self, lexer):
+        stream = lexer.inputStream
+        start = stream.index
+        while True:
+            # getText stops at the end of the input
+            text = stream.getText(start, start + COPY_DATA_CHUNK_SIZE + _LOOKAHEAD - 1)
+            end = _marker_line_end(text, COPY_DATA_CHUNK_SIZE)
+            done = end >= 0 or len(text) < COPY_DATA_CHUNK_SIZE + _LOOKAHEAD
+            chunk = text[:end] if end >= 0 else text if done else text[:COPY_DATA_CHUNK_SIZE]
+            start += len(chunk)
+            stream.seek(start)
+            newlines = chunk.count("\n")
+            lexer.line += newlines
+            lexer.column = len(chunk) - chunk.rfind("\n") - 1 if newlines else lexer.column + len(chunk)
+            self.length += len(chunk)
+            if chunk:
+                yield chunk
+            if done:
+                return
+
+
+def _marker_line_end(text: str, limit: int) -> int:
+    # end of the first end marker line starting before limit, -1 if there is none
+    marker = text.find(_MARKER)
+    while 0 <= marker < limit:
+        line_end = marker + len(_MARKER)
+        line_break = text[line_end:line_end + 2]
+        if line_break in ("", "\r") or line_break[0] == "\n":
+            return line_end + len(line_break[:1])
+        if line_break == "\r\n":
+            return line_end + 2
+        marker = text.find(_MARKER, marker + 1)
+    return -1
+
+
+class Statement:
+    def __init__(self, tokens: list, terminator: Token = None, data: CopyData = None):
+        # all tokens of the statement including hidden ones, without the terminating semicolon
+        self.tokens = tokens
+        self.terminator = terminator
+        # the COPY data of COPY ... FROM stdin
+        self.data = data
+
+    @property
+    def start(self) -> int:
+        return self.tokens[0].start
+
+    @property
+    def stop(self) -> int:
+        # inclusive, like ANTLR token offsets
+        last = self.terminator if self.terminator is not None else self.tokens[-1]
+        return last.stop
+
+    @property
+    def text(self) -> str:
+        # the lexer never skips characters, so the token texts cover the statement exactly,
+        # the COPY data is not part of it
+        tokens = self.tokens if self.terminator is None else self.tokens + [self.terminator]
+        return "".join(token.text for token in tokens)
+
+    @property
+    def length(self) -> int:
+        # characters of the input covered by the statement, COPY data only once it is read
+        return len(self.text) + (self.data.length if self.data is not None else 0)
+
+    def is_empty(self) -> bool:
+        return all(token.channel != Token.DEFAULT_CHANNEL for token in self.tokens)
+
+    def token_stream(self) -> CommonTokenStream:
+        return CommonTokenStream(ListTokenSource(self.tokens))
+
+    def is_copy_from_stdin(self, lexer) -> bool:
+        # COPY with FROM STDIN outside of parentheses, COPY (query) TO ... never reads data
+        token_types = [token.type for token in self.tokens if token.channel == Token.DEFAULT_CHANNEL]
+        if not token_types or token_types[0] != lexer.COPY:
+            return False
+        depth = 0
+        for token_type, next_type in zip(token_types, token_types[1:]):
+            if token_type == lexer.OPEN_PAREN:
+                depth += 1
+            elif token_type == lexer.CLOSE_PAREN:
+                depth = max(depth - 1, 0)
+            elif token_type == lexer.FROM and next_type == lexer.STDIN and depth == 0:
+                return True
+        return False
+
+
+def split_statements(lexer):
+    # Splits at semicolons outside of parentheses using the lexer alone. Dollar-quoted bodies
+    # are lexed in their own mode and psql meta commands end in a SEMI token themselves, so
+    # no semicolon inside them can end a statement. Whitespace/comment-only statements are skipped.
+    semi, open_paren, close_paren = lexer.SEMI, lexer.OPEN_PAREN, lexer.CLOSE_PAREN
+    tokens = []
+    depth = 0
+    while True:
+        token = lexer.nextToken()
+        token_type = token.type
+        if token_type == Token.EOF:
+            break
+        if token_type == open_paren:
+            depth += 1
+        elif token_type == close_paren:
+            depth = max(depth - 1, 0)
+        elif token_type == semi and depth == 0:
+            statement = Statement(tokens, token)
+            tokens = []
+            if statement.is_copy_from_stdin(lexer):
+                statement.data = CopyData(lexer)
+                yield statement
+                # lexing goes on behind the data, whatever was not read of it is skipped
+                statement.data.skip()
+            elif not statement.is_empty():
+                yield statement
+            continue
+        tokens.append(token)
+    statement = Statement(tokens)
+    if tokens and not statement.is_empty():
+        yield statement
@@ -0,0 +1,196 @@
+import codecs
+import io
+import locale
+import mmap
+import os
+from array import array
+from typing import TextIO
+from antlr4 import InputStream, Token
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# lexer predicates look up to two characters behind the current position
+LOOKBEHIND = 2
+
+
+class UnbufferedCharStream:
+    # CharStream reading a text file object chunk by chunk. Only the text since the oldest
+    # open mark is kept: the lexer marks every token start, so memory is bounded by the
+    # longest token rather than the input. Token text has to be copied when tokens are
+    # created (CommonTokenFactory(copyText=True)), it cannot be fetched afterwards.
+
+    def __init__(self, reader: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE, name: str = "<stream>"):
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.name = name
+        self.buffer = ""
+        self.buffer_start = 0
+        self._index = 0
+        self._markers = []
+        self._eof = False
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def sourceName(self):
+        return self.name
+
+    def getSourceName(self):
+        return self.name
+
+    def _fill(self, position: int) -> bool:
+        # reads until position is buffered, returns False if the input ends before it
+        while position >= self.buffer_start + len(self.buffer):
+            if self._eof:
+                return False
+            # reads grow with the retained text, so buffering a long token or COPY data is linear
+            chunk = self.reader.read(max(self.chunk_size, len(self.buffer)))
+            if not chunk:
+                self._eof = True
+                return False
+            keep_from = min(self._markers, default=self._index) - LOOKBEHIND
+            drop = max(keep_from - self.buffer_start, 0)
+            self.buffer = self.buffer[drop:] + chunk
+            self.buffer_start += drop
+        return True
+
+    def consume(self):
+        if self.LA(1) == Token.EOF:
+            raise Exception("cannot consume EOF")
+        self._index += 1
+
+    def LA(self, offset: int):
+        if offset == 0:
+            return 0  # undefined
+        if offset < 0:
+            offset += 1  # e.g., translate LA(-1) to use offset=0
+        position = self._index + offset - 1
+        relative = position - self.buffer_start
+        if 0 <= relative < len(self.buffer):
+            return ord(self.buffer[relative])
+        if position < 0 or not self._fill(position):
+            return Token.EOF
+        if position < self.buffer_start:
+            raise IndexError(f"Position {position} was already released from the stream")
+        return ord(self.buffer[position - self.buffer_start])
+
+    def LT(self, offset: int):
+        return self.LA(offset)
+
+    def mark(self):
+        self._markers.append(self._index)
+        return len(self._markers) - 1
+
+    def release(self, marker: int):
+        del self._markers[marker:]
+
+    def seek(self, index: int):
+        if index < self.buffer_start:
+            raise IndexError(f"Cannot seek to {index}, it was already released from the stream")
+        if index > self._index:
+            self._fill(index - 1)
+            index = min(index, self.buffer_start + len(self.buffer))
+        self._index = index
+
+    def find(self, sub: str, start: int) -> int:
+        # like str.find on the whole input, reads ahead until sub is found or the input ends
+        if start < self.buffer_start:
+            raise IndexError(f"Text at {start} was already released from the stream")
+        while True:
+            position = self.buffer.find(sub, start - self.buffer_start)
+            if position >= 0:
+                return self.buffer_start + position
+            searched_until = self.buffer_start + len(self.buffer)
+            if not self._fill(searched_until):
+                return -1
+            start = max(start, searched_until - len(sub) + 1)
+
+    def end(self) -> int:
+        # reads the rest of the input and returns its length
+        while self._fill(self.buffer_start + len(self.buffer)):
+            pass
+        return self.buffer_start + len(self.buffer)
+
+    def getText(self, start: int, stop: int):
+        if start < self.buffer_start:
+            raise IndexError(f"Text at {start} was already released from the stream")
+        self._fill(stop)
+        return self.buffer[start - self.buffer_start:stop - self.buffer_start + 1]
+
+    def __str__(self):
+        return self.name
+
+
+# Read-only text file object over a memory-mapped file, for UnbufferedCharStream. Every read
+# decodes the next window of the mapping, so the file is never held in memory as a whole: pages
+# come from the page cache and are dropped again once the lexer is past them. Newlines are
+# translated like in text mode open().
+class MappedTextReader(io.TextIOBase):
+    def __init__(self, path: os.PathLike, encoding: str = None):
+        self.name = os.fspath(path)
+        with open(path, "rb") as file:
+            # empty files cannot be mapped
+            size = os.fstat(file.fileno()).st_size
+            self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if size and hasattr(self.mapping, "madvise"):
+            self.mapping.madvise(mmap.MADV_SEQUENTIAL)
+        decoder = codecs.getincrementaldecoder(encoding or locale.getpreferredencoding(False))()
+        self.decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+        self.position = 0
+        self.released = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        end = len(self.mapping) if size is None or size < 0 else self.position + size
+        text = ""
+        # a window may end inside a multibyte character, whose bytes wait for the next one
+        while not text and self.position < len(self.mapping):
+            window = self.mapping[self.position:end]
+            self.position += len(window)
+            end += 4
+            text = self.decoder.decode(window, final=self.position >= len(self.mapping))
+        self._release()
+        return text
+
+    def _release(self):
+        # pages behind the read position are never read again, they leave the resident set
+        released = self.position - self.position % mmap.PAGESIZE
+        if released > self.released and hasattr(self.mapping, "madvise"):
+            self.mapping.madvise(mmap.MADV_DONTNEED, self.released, released - self.released)
+            self.released = released
+
+    def close(self):
+        if isinstance(self.mapping, mmap.mmap):
+            self.mapping.close()
+        super().close()
+
+
+def _code_points(text: str):
+    # the narrowest buffer holding every code point of text, indexing it yields ints like ord()
+    if text.isascii():
+        return text.encode("ascii")
+    widest = max(map(ord, text))
+    if widest < 0x100:
+        return text.encode("latin-1")
+    if widest < 0x10000:
+        codes = array("H")
+        codes.frombytes(text.encode("utf-16-le", "surrogatepass"))
+    else:
+        codes = array("I")
+        codes.frombytes(text.encode("utf-32-le", "surrogatepass"))
+    return codes
+
+
+class CompactInputStream(InputStream):
+    # InputStream without its list of ord() ints, which costs 8 bytes per character plus an int
+    # object for every character above U+00FF. Code points come from a bytes/array buffer of
+    # 1, 2 or 4 bytes per character, token text is sliced from the original str.
+    __slots__ = ()
+
+    def _loadString(self):
+        self._index = 0
+        self.data = _code_points(self.strdata)
+        self._size = len(self.strdata)
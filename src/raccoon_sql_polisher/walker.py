@@ -0,0 +1,72 @@
+from functools import cache
+from antlr4 import ParserRuleContext, ParseTreeListener, ParseTreeWalker
+
+GENERATED_LISTENER_MODULE = "raccoon_sql_polisher.parser.PostgreSQLParserListener"
+GENERIC_HOOKS = ("enterEveryRule", "exitEveryRule", "visitTerminal", "visitErrorNode")
+
+
+def _is_override(listener_class, name: str) -> bool:
+    method = getattr(listener_class, name, None)
+    if method is None:
+        return False
+    # the generated listener only provides no-op stubs for every rule
+    return getattr(method, "__module__", None) != GENERATED_LISTENER_MODULE
+
+
+@cache
+def dispatch_table(listener_class, rule_names: tuple):
+    # enter/exit map rule indices to the methods the class overrides, consumed holds the
+    # rules (named in consumed_rules) whose subtrees the listener handles itself.
+    # None means a generic hook is overridden and every node has to be visited.
+    if any(
+        getattr(listener_class, hook) is not getattr(ParseTreeListener, hook)
+        for hook in GENERIC_HOOKS
+    ):
+        return None
+    enter = {}
+    exit = {}
+    for rule_index, rule_name in enumerate(rule_names):
+        method_suffix = rule_name[0].upper() + rule_name[1:]
+        if _is_override(listener_class, "enter" + method_suffix):
+            enter[rule_index] = getattr(listener_class, "enter" + method_suffix)
+        if _is_override(listener_class, "exit" + method_suffix):
+            exit[rule_index] = getattr(listener_class, "exit" + method_suffix)
+    consumed = frozenset(
+        rule_names.index(rule_name) for rule_name in getattr(listener_class, "consumed_rules", ())
+    )
+    return enter, exit, consumed
+
+
+# Calls only the rule methods a listener actually overrides and does not descend
+# into subtrees the listener consumes on enter.
+class SparseParseTreeWalker:
+    def __init__(self, rule_names):
+        self.rule_names = tuple(rule_names)
+
+    def walk(self, listener: ParseTreeListener, tree):
+        table = dispatch_table(type(listener), self.rule_names)
+        if table is None:
+            ParseTreeWalker.DEFAULT.walk(listener, tree)
+            return
+        enter, exit, consumed = table
+
+        # explicit stack, so deeply nested expressions cannot hit the recursion limit
+        stack = [(tree, False)]
+        while stack:
+            node, exiting = stack.pop()
+            rule_index = node.getRuleIndex()
+            if exiting:
+                exit[rule_index](listener, node)
+                continue
+            enter_method = enter.get(rule_index)
+            if enter_method is not None:
+                enter_method(listener, node)
+            if rule_index in exit:
+                stack.append((node, True))
+            if rule_index in consumed or not node.children:
+                continue
+            stack.extend(
+                (child, False)
+                for child in reversed(node.children)
+                if isinstance(child, ParserRuleContext)
+            )
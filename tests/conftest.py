@@ -0,0 +1,25 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+# Test modules load the recognizers at import time, which already writes cache entries, so the
+# cache directory is redirected before any of them is collected. Subprocesses inherit it.
+_cache_dir = None
+
+
+def pytest_configure(config):
+    global _cache_dir
+    _cache_dir = tempfile.mkdtemp(prefix="raccoon-cache-")
+    os.environ["RACCOON_CACHE_DIR"] = _cache_dir
+    os.environ.pop("RACCOON_NO_CACHE", None)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_cache_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(monkeypatch):
+    # restores the test cache directory for every test, whatever an earlier test did to it
+    monkeypatch.setenv("RACCOON_CACHE_DIR", _cache_dir)
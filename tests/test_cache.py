@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+from antlr4 import CommonTokenStream, InputStream
+from raccoon_sql_polisher.cache import atn_cache_path, load_atn, save_dfa_snapshot
+from raccoon_sql_polisher.lexer.PostgreSQLLexer import PostgreSQLLexer, serializedATN
+
+
+def test_load_atn_writes_and_reuses_cache_entry(tmp_path, monkeypatch):
+    monkeypatch.setenv("RACCOON_CACHE_DIR", str(tmp_path))
+    serialized_atn = serializedATN()
+
+    atn, decisions_to_dfa = load_atn(serialized_atn, "PostgreSQLLexer")
+    cache_path = atn_cache_path(tmp_path, "PostgreSQLLexer", serialized_atn)
+    assert cache_path.exists()
+
+    cached_atn, cached_decisions_to_dfa = load_atn(serialized_atn, "PostgreSQLLexer")
+    assert len(cached_atn.states) == len(atn.states)
+    assert len(cached_decisions_to_dfa) == len(decisions_to_dfa)
+    assert cached_decisions_to_dfa[0].atnStartState is cached_atn.decisionToState[0]
+
+
+def test_load_atn_rebuilds_corrupt_cache_entry(tmp_path, monkeypatch):
+    monkeypatch.setenv("RACCOON_CACHE_DIR", str(tmp_path))
+    serialized_atn = serializedATN()
+    cache_path = atn_cache_path(tmp_path, "PostgreSQLLexer", serialized_atn)
+    cache_path.write_bytes(b"not a pickle")
+
+    atn, _ = load_atn(serialized_atn, "PostgreSQLLexer")
+
+    assert atn.decisionToState
+    assert cache_path.read_bytes() != b"not a pickle"
+
+
+def test_dfa_snapshot_is_loaded_with_warm_dfas(tmp_path, monkeypatch):
+    monkeypatch.setenv("RACCOON_CACHE_DIR", str(tmp_path))
+    CommonTokenStream(PostgreSQLLexer(InputStream("SELECT a FROM b;"))).fill()
+
+    save_dfa_snapshot(PostgreSQLLexer)
+    _, decisions_to_dfa = load_atn(serializedATN(), "PostgreSQLLexer")
+
+    assert any(dfa.states for dfa in decisions_to_dfa)
+
+
+TRAIN = """
+from raccoon_sql_polisher.cache import save_dfa_snapshot
+from raccoon_sql_polisher.formatter import format_sql
+from raccoon_sql_polisher.parsing import load_recognizers
+format_sql("SELECT name FROM users WHERE age > 10; INSERT INTO t VALUES (1, 'a');")
+for recognizer_class in load_recognizers():
+    save_dfa_snapshot(recognizer_class)
+"""
+UNSEEN = "select a0, b from t where x = 0; update u set c = c + 1 where d in (select e from f);"
+
+
+def run_python(code: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", code], env={**os.environ, **env}, capture_output=True, text=True, check=True
+    )
+
+
+def test_parser_dfa_snapshot_parses_unseen_statements(tmp_path):
+    run_python(TRAIN, RACCOON_CACHE_DIR=str(tmp_path))
+    assert list(tmp_path.glob("PostgreSQLParser-*.dfa"))
+    for prediction_mode in ("two-stage", "ll"):
+        code = (
+            "from raccoon_sql_polisher.formatter import format_sql; "
+            f"print(format_sql({UNSEEN!r}, prediction_mode={prediction_mode!r}))"
+        )
+        warm = run_python(code, RACCOON_CACHE_DIR=str(tmp_path))
+        cold = run_python(code, RACCOON_NO_CACHE="1")
+        assert warm.stderr == ""
+        assert warm.stdout == cold.stdout
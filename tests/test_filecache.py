@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+from raccoon_sql_polisher import filecache
+from raccoon_sql_polisher.filecache import FileCache
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    cache_path = tmp_path / "files.json"
+    sql_file = tmp_path / "a.sql"
+    sql_file.write_text("SELECT 1;")
+    file_cache = FileCache({}, cache_path)
+    assert not file_cache.is_formatted(sql_file)
+    file_cache.record(sql_file)
+    file_cache.save()
+
+    file_cache = FileCache({}, cache_path)
+    assert file_cache.is_formatted(sql_file)
+    # touched without changing the content
+    stat = sql_file.stat()
+    os.utime(sql_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert file_cache.is_formatted(sql_file)
+    sql_file.write_text("SELECT 2;")
+    assert not file_cache.is_formatted(sql_file)
+    assert file_cache.skipped == 2
+
+
+def test_cache_of_another_tool_version_is_ignored(tmp_path, monkeypatch):
+    cache_path = tmp_path / "files.json"
+    sql_file = tmp_path / "a.sql"
+    sql_file.write_text("SELECT 1;")
+    file_cache = FileCache({}, cache_path)
+    file_cache.record(sql_file)
+    file_cache.save()
+
+    monkeypatch.setattr(filecache, "tool_fingerprint", lambda: "other")
+    file_cache = FileCache({}, cache_path)
+    assert not file_cache.is_formatted(sql_file)
+
+
+def test_budget_settings_have_their_own_record(tmp_path):
+    sql_file = tmp_path / "a.sql"
+    sql_file.write_text("selec bad from x;\nselect a from t;")
+    env = {**os.environ, "RACCOON_CACHE_DIR": str(tmp_path / "cache")}
+    command = [sys.executable, "-m", "raccoon_sql_polisher.formatter", str(sql_file)]
+    subprocess.run(command + ["--verbatim-on-error"], env=env, capture_output=True, check=True)
+    verbatim = sql_file.read_text()
+    result = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    assert "skipped" not in result.stdout
+    assert sql_file.read_text() != verbatim
@@ -1,5 +1,7 @@
 import pytest
-from raccoon_sql_polisher.formatter import format_sql_file
+from antlr4 import ParserRuleContext
+from antlr4.tree.Tree import TerminalNodeImpl
+from raccoon_sql_polisher.formatter import Formatter, SqlFormatter, format_sql, format_sql_file, format_sql_text_fragments
 
 
 @pytest.mark.parametrize(
@@ -21,3 +23,104 @@ def test_formatter(input_query, expected_formatted_query, tmp_path):
     with open(sql_file, "r") as output_file:
         formatted_code = output_file.read()
         assert formatted_code == expected_formatted_query
+
+
+def test_leaf_traversal_has_no_recursion_limit():
+    root = ctx = ParserRuleContext()
+    for _ in range(20_000):
+        child = ParserRuleContext(ctx)
+        ctx.addChild(TerminalNodeImpl(None))
+        ctx.addChild(child)
+        ctx = child
+    leaves = list(Formatter.get_leaf_nodes(root))
+    assert len(leaves) == 20_001
+    assert leaves[-1] is ctx
+
+
+def test_formatting_while_parsing_matches_tree_formatting():
+    sql_text = (
+        "create table t (id int primary key, name varchar(10));\n"
+        "select a.b, count(c) from t where (x > 1 and y in (1, 2)) group by 1;\n"
+        "select from where;\n"
+        "insert into t values (1, 'a'), (2, 'b');"
+    )
+    formatter_options = dict(indent=True, max_words_per_line=4)
+    with_trees = "".join(format_sql_text_fragments(sql_text, formatter_options))
+    while_parsing = "".join(format_sql_text_fragments(sql_text, formatter_options, parse_trees=False))
+    assert while_parsing == with_trees
+
+
+MIXED_STATEMENTS = (
+    "select a from t where id = 1;\n"
+    "create index idx_a on t (a);\n"
+    "grant select on t to u;\n"
+    "alter table t add column b int;\n"
+)
+
+
+# outputs of the formatter from before statements were formatted independently
+@pytest.mark.parametrize("formatter_options, expected", [
+    (dict(indent=True),
+     "\nSELECT\n    a\nFROM\n    t\nWHERE\n    id = 1;\n\n create index idx_a on t( a\n);\n\n"
+     " grant select on t to u;\n\n alter table t add column b int;\n"),
+    (dict(max_words_per_line=3),
+     "SELECT a\nFROM t\nWHERE id = 1\n;\n\n create index idx_a\n on t (\na\n\n);\n\n"
+     " grant select on\n t to u\n;\n\n alter table t\n add column b\n int;\n"),
+])
+def test_statements_after_the_first_keep_their_layout(formatter_options, expected):
+    assert format_sql(MIXED_STATEMENTS, **formatter_options) == expected
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_unchanged_file_is_not_rewritten(tmp_path, stream):
+    sql_file = tmp_path / "input.sql"
+    sql_file.write_text("select a from t;")
+    assert format_sql_file(sql_file, stream=stream)
+    formatted = sql_file.read_bytes()
+    mtime = sql_file.stat().st_mtime_ns
+    assert not format_sql_file(sql_file, stream=stream)
+    assert sql_file.read_bytes() == formatted and sql_file.stat().st_mtime_ns == mtime
+    assert [path.name for path in tmp_path.iterdir()] == ["input.sql"]
+
+    # same text, but other line endings
+    sql_file.write_bytes(formatted.replace(b"\n", b"\r\n"))
+    assert format_sql_file(sql_file, stream=stream)
+    assert sql_file.read_bytes() == formatted
+
+
+def test_format_sql_equals_file_output(tmp_path):
+    sql_text = "select a, b from t where a = 1;\ninsert into t values (1, 'x');"
+    sql_file = tmp_path / "input.sql"
+    sql_file.write_text(sql_text)
+    format_sql_file(sql_file, indent=True)
+    assert format_sql(sql_text, indent=True) == sql_file.read_text()
+
+
+def test_sql_formatter_is_reset_between_calls():
+    sql_formatter = SqlFormatter()
+    formatted = sql_formatter.format("select a from t;")
+    # an unterminated dollar-quoted body leaves the lexer in another mode
+    sql_formatter.format("select $body$ select 1;")
+    assert sql_formatter.format("select a from t;") == formatted
+    assert sql_formatter.lexer.tags == []
+    assert sql_formatter.parse_stats.parses == 3
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_symlinked_file_is_formatted_through_the_link(tmp_path, stream):
+    real_file = tmp_path / "real.sql"
+    real_file.write_text("select a from t;")
+    link = tmp_path / "link.sql"
+    link.symlink_to(real_file)
+    assert format_sql_file(link, stream=stream)
+    assert link.is_symlink()
+    assert real_file.read_text() == "SELECT a\nFROM t;\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["link.sql", "real.sql"]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_copy_without_data_keeps_the_final_newline(tmp_path, stream):
+    sql_file = tmp_path / "input.sql"
+    sql_file.write_text("select 1;\nCOPY t FROM stdin;")
+    format_sql_file(sql_file, stream=stream)
+    assert sql_file.read_text() == "SELECT 1;\n\n copy t from stdin;\n"
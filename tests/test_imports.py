@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import pytest
+
+RECOGNIZER_MODULES = (
+    "raccoon_sql_polisher.lexer.PostgreSQLLexer",
+    "raccoon_sql_polisher.parser.PostgreSQLParser",
+    "raccoon_sql_polisher.parser.PostgreSQLParserListener",
+)
+
+
+def imported_modules(*args: str) -> set[str]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+    )
+    return {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ("-c", "import raccoon_sql_polisher.formatter"),
+        ("-m", "raccoon_sql_polisher.formatter", "--help"),
+        ("-m", "raccoon_sql_polisher.formatter", "does/not/exist.sql"),
+    ],
+)
+def test_recognizers_are_not_imported_without_parsing(args):
+    modules = imported_modules(*args)
+    assert "antlr4" in modules
+    assert not modules.intersection(RECOGNIZER_MODULES)
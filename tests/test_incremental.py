@@ -0,0 +1,28 @@
+from raccoon_sql_polisher.formatter import finish_fragments, format_sql_text_fragments
+from raccoon_sql_polisher.incremental import IncrementalFormatter
+
+SQL = "".join(f"SELECT a{i}, b FROM t{i} WHERE a{i} = 1;\n" for i in range(20))
+
+
+def format_full(sql: str, formatter_options: dict) -> str:
+    return "".join(finish_fragments(format_sql_text_fragments(sql, formatter_options), formatter_options))
+
+
+def test_edit_reparses_only_the_changed_statement():
+    formatter = IncrementalFormatter(newline_after_comma=True)
+    assert formatter.format(SQL) == format_full(SQL, formatter.formatter_options)
+    assert formatter.reparsed == 20
+
+    start = SQL.index("t7")
+    edited = formatter.edit(start, start + 2, "other_table")
+    assert formatter.reparsed == 1
+    assert edited == format_full(formatter.text, formatter.formatter_options)
+
+
+def test_edits_that_move_statement_boundaries():
+    formatter = IncrementalFormatter()
+    formatter.format(SQL)
+    # an opened dollar quote swallows the following statements, closing it brings them back
+    for sql in (SQL.replace("FROM t3", "FROM $$ t3"), SQL.replace("t5;", "t5"), SQL):
+        assert formatter.format(sql) == format_full(sql, formatter.formatter_options)
+    assert formatter.reparsed < 20
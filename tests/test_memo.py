@@ -0,0 +1,59 @@
+from antlr4 import InputStream
+from raccoon_sql_polisher import memo as memo_module
+from raccoon_sql_polisher.formatter import format_sql_text_fragments
+from raccoon_sql_polisher.memo import StatementMemo, statement_key
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.splitter import split_statements
+
+PostgreSQLLexer, _ = load_recognizers()
+
+
+def key(sql: str, **formatter_options) -> str:
+    (statement,) = split_statements(PostgreSQLLexer(InputStream(sql)))
+    return statement_key(statement, formatter_options)
+
+
+def test_key_ignores_whitespace_and_comments_only():
+    assert key("SELECT a FROM t;") == key("SELECT  a\n/* c */ FROM t -- x\n;")
+    assert key("SELECT a FROM t;") != key("SELECT b FROM t;")
+    assert key("SELECT a FROM t;") != key("SELECT a FROM t;", indent=True)
+
+
+def test_repeated_statements_are_not_parsed_again():
+    memo = StatementMemo()
+    sql = "GRANT SELECT ON t TO u;\n" * 5 + "SELEC broken;\n" * 2
+    fragments = list(format_sql_text_fragments(sql, {}, memo=memo))
+    assert fragments == list(format_sql_text_fragments(sql, {}))
+    # the first statement and statements with syntax errors are parsed every time
+    assert (memo.hits, memo.misses) == (3, 3)
+
+
+def test_copy_data_and_ugly_output_are_not_memoized():
+    memo = StatementMemo()
+    sql = "COPY t (a) FROM stdin;\n1\n2\n\\.\n" * 3
+    list(format_sql_text_fragments(sql, {}, memo=memo))
+    assert (memo.hits, memo.misses) == (0, 0) and not memo._entries
+    list(format_sql_text_fragments("SELECT a FROM t;\n" * 3, dict(ugly=True), memo=memo))
+    assert (memo.hits, memo.misses) == (0, 0)
+
+
+def test_disk_tier_survives_runs_and_evicts_least_recently_used(tmp_path):
+    path = tmp_path / "statements.sqlite3"
+    with StatementMemo(disk=True, path=path) as memo:
+        memo.put("a", "x" * 60)
+        memo.put("b", "y" * 60)
+    with StatementMemo(disk=True, path=path, max_disk_bytes=100) as memo:
+        assert memo.get("b") == "y" * 60
+        memo.put("c", "z" * 30)
+    with StatementMemo(disk=True, path=path) as memo:
+        assert [memo.get(k) is not None for k in "abc"] == [False, True, True]
+        assert memo.summary() == "statement cache hit rate 66.7% (0 memory, 2 disk hits of 3 statements)"
+
+
+def test_disk_tier_of_another_tool_version_is_dropped(tmp_path, monkeypatch):
+    path = tmp_path / "statements.sqlite3"
+    with StatementMemo(disk=True, path=path) as memo:
+        memo.put("a", "x")
+    monkeypatch.setattr(memo_module, "tool_fingerprint", lambda: "other")
+    with StatementMemo(disk=True, path=path) as memo:
+        assert memo.get("a") is None
@@ -0,0 +1,25 @@
+import io
+from raccoon_sql_polisher.output import OutputBuffer
+
+
+def test_tail_changes_span_chunks():
+    output = OutputBuffer()
+    for chunk in ("CREATE TABLE t (a int", ")", ";", "\n", "\n"):
+        output.append(chunk)
+    assert output.tail(4) == ");\n\n"
+    output.drop_tail(2)
+    output.replace_tail(2, "\n" + output.tail(2))
+    assert output.getvalue() == "CREATE TABLE t (a int\n);"
+    assert len(output) == len(output.getvalue())
+    output.drop_tail(100)
+    assert output.getvalue() == "" and output.tail(3) == ""
+
+
+def test_flush_writes_chunks_to_sink():
+    output = OutputBuffer()
+    output.append("SELECT 1;")
+    output.append("\n")
+    sink = io.StringIO()
+    output.flush(sink)
+    assert sink.getvalue() == "SELECT 1;\n"
+    assert output.take() == ""
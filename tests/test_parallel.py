@@ -0,0 +1,44 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from raccoon_sql_polisher.formatter import format_sql_file
+from raccoon_sql_polisher.parallel import StatementPool
+
+SAMPLE = Path(__file__).parent / "test.sql"
+
+
+def test_parallel_formatting_matches_sequential(tmp_path):
+    sequential_file = tmp_path / "sequential.sql"
+    parallel_file = tmp_path / "parallel.sql"
+    shutil.copy(SAMPLE, sequential_file)
+    shutil.copy(SAMPLE, parallel_file)
+
+    format_sql_file(sequential_file, indent=True)
+    with StatementPool(jobs=2, chunk_size=2) as pool:
+        format_sql_file(parallel_file, indent=True, pool=pool)
+
+    assert parallel_file.read_text() == sequential_file.read_text()
+
+
+
+def test_parallel_formatting_starts_chunks_like_sequential(tmp_path):
+    sql_text = "grant select on t to u;\ncreate index idx_a on t (a);\nselect a from t;\n" * 3
+    sequential_file = tmp_path / "sequential.sql"
+    parallel_file = tmp_path / "parallel.sql"
+    sequential_file.write_text(sql_text)
+    parallel_file.write_text(sql_text)
+
+    format_sql_file(sequential_file, indent=True, max_words_per_line=3)
+    with StatementPool(jobs=2, chunk_size=2) as pool:
+        format_sql_file(parallel_file, indent=True, max_words_per_line=3, pool=pool)
+
+    assert parallel_file.read_text() == sequential_file.read_text()
+
+def test_negative_jobs_are_rejected():
+    result = subprocess.run(
+        [sys.executable, "-m", "raccoon_sql_polisher.formatter", str(SAMPLE), "--jobs", "-1"],
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 2
+    assert "--jobs/-j: must be 0 or more" in result.stderr
@@ -0,0 +1,56 @@
+import pytest
+from antlr4 import CommonTokenStream, InputStream
+from raccoon_sql_polisher.formatter import format_sql_text_fragments
+from raccoon_sql_polisher.memo import StatementMemo
+from raccoon_sql_polisher.parsing import LL, TWO_STAGE, ParseBudget, ParseStats, load_recognizers, parse
+
+PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+
+
+def make_parser(sql: str):
+    return PostgreSQLParser(CommonTokenStream(PostgreSQLLexer(InputStream(sql))))
+
+
+def test_two_stage_parse_stays_in_sll_for_valid_input():
+    stats = ParseStats()
+    tree = parse(make_parser("SELECT a FROM t WHERE b = 1;"), prediction_mode=TWO_STAGE, stats=stats)
+    assert tree.getText() == "SELECTaFROMtWHEREb=1;<EOF>"
+    assert (stats.parses, stats.ll_fallbacks) == (1, 0)
+
+
+def test_two_stage_parse_falls_back_to_ll_on_syntax_error():
+    stats = ParseStats()
+    sql = "SELECT a FROM WHERE;"
+    tree = parse(make_parser(sql), prediction_mode=TWO_STAGE, stats=stats)
+    assert tree.toStringTree(recog=PostgreSQLParser) == (
+        parse(make_parser(sql), prediction_mode=LL).toStringTree(recog=PostgreSQLParser)
+    )
+    assert (stats.parses, stats.ll_fallbacks) == (1, 1)
+
+
+def test_parse_rejects_unknown_prediction_mode():
+    with pytest.raises(ValueError):
+        parse(make_parser("SELECT 1;"), prediction_mode="lalr")
+
+
+def test_statements_over_budget_are_copied_verbatim(capsys):
+    stats = ParseStats()
+    sql = "SELECT a FROM t;\nSELEC garbage;\nSELECT b, c, d FROM u;"
+    fragments = list(format_sql_text_fragments(sql, {}, parse_stats=stats, budget=ParseBudget(max_tokens=6)))
+    assert fragments[1:] == ["SELEC garbage;\n\n", "SELECT b, c, d FROM u;\n\n"]
+    assert [str(d) for d in stats.diagnostics] == [
+        "line 2:0 syntax error at 'SELEC', statement copied verbatim",
+        "line 3:0 statement has 8 tokens, the budget is 6, statement copied verbatim",
+    ]
+    # no error spam from the parser
+    assert capsys.readouterr().err == ""
+
+
+def test_memoized_statements_over_budget_are_copied_verbatim():
+    memo = StatementMemo()
+    sql = "SELECT 1;\nSELECT a FROM t;\n"
+    list(format_sql_text_fragments(sql, {}, memo=memo))
+    stats = ParseStats()
+    fragments = list(format_sql_text_fragments(sql, {}, parse_stats=stats, memo=memo, budget=ParseBudget(max_tokens=3)))
+    assert fragments[1] == "SELECT a FROM t;\n\n"
+    assert [str(d) for d in stats.diagnostics] == ["line 2:0 statement has 4 tokens, the budget is 3, statement copied verbatim"]
@@ -0,0 +1,40 @@
+from raccoon_sql_polisher.spacing import (
+    COLUMN_CONSTRAINTS,
+    CREATE_TABLE,
+    INDENT_AFTER_KEYWORD,
+    NO_SPACING,
+    NUMBER_OF_CODES,
+    NUMBER_OF_STATES,
+    NODE_CODES,
+    PREVIOUS_CODES,
+    SPACING_TABLE,
+    VALUES_KEYWORD,
+    NodeType,
+    compile_spacing_rules,
+    spacing_index,
+)
+
+
+def spacing(state: int, previous, leaf) -> tuple:
+    code = leaf if leaf == VALUES_KEYWORD else NODE_CODES[leaf]
+    prefix, case, suffix, enters_column_constraints = SPACING_TABLE[spacing_index(state, PREVIOUS_CODES[previous], code)]
+    return prefix + case("Ab") + suffix, enters_column_constraints
+
+
+def test_table_covers_every_state_and_leaf():
+    assert len(SPACING_TABLE) == NUMBER_OF_STATES * NUMBER_OF_CODES * NUMBER_OF_CODES
+    assert all(len(entry) == 4 for entry in SPACING_TABLE)
+    assert compile_spacing_rules(()) == (NO_SPACING,) * len(SPACING_TABLE)
+
+
+def test_first_matching_rule_wins():
+    assert spacing(0, None, NodeType.KEYWORD) == ("AB", False)
+    assert spacing(0, NodeType.STRING, NodeType.KEYWORD) == ("\nAB", False)
+    assert spacing(0, None, VALUES_KEYWORD) == ("\nAB ", False)
+    assert spacing(CREATE_TABLE, NodeType.KEYWORD, NodeType.LEFT_PARENTHESIS) == (" Ab\n", True)
+    assert spacing(0, NodeType.KEYWORD, NodeType.LEFT_PARENTHESIS) == ("Ab", False)
+    assert spacing(INDENT_AFTER_KEYWORD, NodeType.KEYWORD, NodeType.REGULAR) == ("\n\tab", False)
+    assert spacing(0, NodeType.KEYWORD, NodeType.REGULAR) == (" ab", False)
+    assert spacing(COLUMN_CONSTRAINTS | CREATE_TABLE, NodeType.COMMA, NodeType.REGULAR) == ("\nab", False)
+    assert spacing(COLUMN_CONSTRAINTS, None, VALUES_KEYWORD) == (" AB", False)
+    assert spacing(COLUMN_CONSTRAINTS, NodeType.REGULAR, NodeType.DOT) == ("Ab", False)
@@ -0,0 +1,74 @@
+import io
+from antlr4 import InputStream
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from raccoon_sql_polisher import splitter
+from raccoon_sql_polisher.parsing import load_recognizers, parse_statements
+from raccoon_sql_polisher.splitter import split_statements
+from raccoon_sql_polisher.streams import UnbufferedCharStream
+
+PostgreSQLLexer, _ = load_recognizers()
+
+
+def statement_texts(sql: str) -> list[str]:
+    return [sql[s.start:s.stop + 1].strip() for s in split_statements(PostgreSQLLexer(InputStream(sql)))]
+
+
+def test_split_at_top_level_semicolons_only():
+    sql = (
+        "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; SELECT 2; $$ LANGUAGE sql;\n"
+        "CREATE RULE r AS ON INSERT TO t DO ALSO (INSERT INTO a VALUES (1); INSERT INTO b VALUES (2));\n"
+        "SELECT ';'"
+    )
+    assert statement_texts(sql) == [
+        "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; SELECT 2; $$ LANGUAGE sql;",
+        "CREATE RULE r AS ON INSERT TO t DO ALSO (INSERT INTO a VALUES (1); INSERT INTO b VALUES (2));",
+        "SELECT ';'",
+    ]
+
+
+def test_split_skips_empty_statements():
+    assert statement_texts(";; -- nothing here\n; SELECT 1;\n/* done */") == ["SELECT 1;"]
+
+
+def test_syntax_error_does_not_affect_following_statements():
+    sql = "SELECT a FROM t; SELEC garbage; SELECT b FROM u;"
+    trees = [
+        tree
+        for _, tree in parse_statements(split_statements(PostgreSQLLexer(InputStream(sql))))
+    ]
+    assert [tree.exception is None for tree in trees] == [True, False, True]
+    assert trees[2].getText() == "SELECTbFROMu"
+
+
+def test_copy_from_stdin_data_is_taken_verbatim():
+    sql = (
+        "COPY t (a, b) FROM stdin;\n1\tx;y\n2\t(\n\\.\n"
+        "SELECT 1;\n"
+        "COPY (SELECT a FROM t) TO stdout;\n"
+        "COPY u FROM STDIN;\n3\t\\\\.\n"
+    )
+    for char_stream in (InputStream(sql), UnbufferedCharStream(io.StringIO(sql), 3)):
+        lexer = PostgreSQLLexer(char_stream)
+        lexer._factory = CommonTokenFactory(copyText=True)
+        statements, data = [], []
+        for statement in split_statements(lexer):
+            statements.append(statement)
+            data.append(statement.data and statement.data.read())
+        assert data == ["\n1\tx;y\n2\t(\n\\.\n", None, None, "\n3\t\\\\.\n"]
+        assert "".join(s.text + (d or "") for s, d in zip(statements, data)) == sql
+        assert statements[1].tokens[0].line == 5
+
+
+def test_copy_data_is_read_in_chunks(monkeypatch):
+    monkeypatch.setattr(splitter, "COPY_DATA_CHUNK_SIZE", 4)
+    rows = "".join(f"{i}\t\\.x\n" for i in range(5))
+    sql = f"COPY t FROM stdin;\n{rows}\\.\r\nCOPY u FROM stdin;\n1\n\\.\nSELECT 1;"
+    lexer = PostgreSQLLexer(UnbufferedCharStream(io.StringIO(sql), 4))
+    lexer._factory = CommonTokenFactory(copyText=True)
+    statements = split_statements(lexer)
+    chunks = list(next(statements).data)
+    assert "".join(chunks) == f"\n{rows}\\.\r\n" and len(chunks) > 5
+    # data that is not read is skipped
+    assert next(statements).text == "COPY u FROM stdin;"
+    select = next(statements)
+    assert (select.text, select.tokens[-1].line) == ("SELECT 1;", 11)
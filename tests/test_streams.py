@@ -0,0 +1,78 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from antlr4 import InputStream
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from raccoon_sql_polisher.formatter import format_sql_file, format_sql_stream
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.streams import CompactInputStream, MappedTextReader, UnbufferedCharStream
+
+PostgreSQLLexer, _ = load_recognizers()
+SQL = (
+    "SELECT a, b FROM t WHERE a = 1 AND b = 'x;y';\n"
+    "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql;\n"
+    "-- trailing comment\n"
+    "INSERT INTO t VALUES (1, 2), (3, 4);\n"
+)
+
+
+def tokens(lexer) -> list[tuple[int, str, int, int]]:
+    return [(t.type, t.text, t.start, t.stop) for t in lexer.getAllTokens()]
+
+
+def test_unbuffered_stream_lexes_like_input_stream():
+    expected = tokens(PostgreSQLLexer(InputStream(SQL)))
+    for chunk_size in (1, 7, 4096):
+        lexer = PostgreSQLLexer(UnbufferedCharStream(io.StringIO(SQL), chunk_size))
+        lexer._factory = CommonTokenFactory(copyText=True)
+        assert tokens(lexer) == expected
+
+
+@pytest.mark.parametrize("text", [SQL, SQL + "SELECT 'é';", SQL + "SELECT 'щ', \"名\";", SQL + "SELECT '😀';"])
+def test_compact_stream_lexes_like_input_stream(text: str):
+    stream = CompactInputStream(text)
+    assert [stream.LA(offset) for offset in range(1, len(text) + 2)] == [ord(char) for char in text] + [-1]
+    stream.seek(len(text) - 3)
+    assert stream.LA(-1) == ord(text[-4]) and stream.getText(len(text) - 3, len(text)) == text[-3:]
+    assert tokens(PostgreSQLLexer(CompactInputStream(text))) == tokens(PostgreSQLLexer(InputStream(text)))
+
+
+def test_stream_output_equals_file_output(tmp_path: Path):
+    sql_file = tmp_path / "test.sql"
+    sql_file.write_text(SQL)
+    format_sql_file(sql_file, newline_after_comma=True)
+    streamed = "".join(format_sql_stream(io.StringIO(SQL), newline_after_comma=True))
+    assert streamed == sql_file.read_text()
+
+    sql_file.write_text(SQL)
+    format_sql_file(sql_file, newline_after_comma=True, stream=True)
+    assert sql_file.read_text() == streamed
+
+    sql_file.write_text(SQL)
+    format_sql_file(sql_file, newline_after_comma=True, mapped=True)
+    assert sql_file.read_text() == streamed
+
+
+def test_mapped_reader_decodes_across_windows(tmp_path: Path):
+    sql_file = tmp_path / "test.sql"
+    sql_file.write_bytes("SELECT 'é😀';\r\n".encode() * 3)
+    for size in (1, 2, 3, 7):
+        with MappedTextReader(sql_file, encoding="utf-8") as reader:
+            assert "".join(iter(lambda: reader.read(size), "")) == "SELECT 'é😀';\n" * 3
+    sql_file.write_bytes(b"")
+    with MappedTextReader(sql_file) as reader:
+        assert reader.read(10) == ""
+
+
+def test_stdin_is_formatted_to_stdout(tmp_path: Path):
+    result = subprocess.run(
+        [sys.executable, "-m", "raccoon_sql_polisher.formatter", "-", "--newline-after-comma"],
+        input=SQL, capture_output=True, text=True, check=True,
+    )
+    sql_file = tmp_path / "test.sql"
+    sql_file.write_text(SQL)
+    format_sql_file(sql_file, newline_after_comma=True)
+    assert result.stdout == sql_file.read_text()
+    assert list(tmp_path.iterdir()) == [sql_file]
@@ -0,0 +1,62 @@
+from antlr4 import CommonTokenStream, InputStream, ParseTreeListener
+from raccoon_sql_polisher.parsing import load_recognizers
+from raccoon_sql_polisher.walker import SparseParseTreeWalker
+
+PostgreSQLLexer, PostgreSQLParser = load_recognizers()
+
+
+def parse(sql: str):
+    return PostgreSQLParser(CommonTokenStream(PostgreSQLLexer(InputStream(sql)))).root()
+
+
+class RecordingListener(ParseTreeListener):
+    def __init__(self):
+        self.events = []
+
+    def enterStmt(self, ctx):
+        self.events.append("enterStmt")
+
+    def exitStmt(self, ctx):
+        self.events.append("exitStmt")
+
+    def enterColumnref(self, ctx):
+        self.events.append("enterColumnref " + ctx.getText())
+
+    def exitRoot(self, ctx):
+        self.events.append("exitRoot")
+
+
+class ConsumingListener(RecordingListener):
+    consumed_rules = ("stmt",)
+
+
+class EveryRuleListener(RecordingListener):
+    def enterEveryRule(self, ctx):
+        self.events.append("every")
+
+
+def walk(listener, sql: str):
+    SparseParseTreeWalker(PostgreSQLParser.ruleNames).walk(listener, parse(sql))
+    return listener.events
+
+
+def test_walker_dispatches_only_overridden_rules_in_order():
+    assert walk(RecordingListener(), "SELECT a FROM t; SELECT b FROM t;") == [
+        "enterStmt",
+        "enterColumnref a",
+        "exitStmt",
+        "enterStmt",
+        "enterColumnref b",
+        "exitStmt",
+        "exitRoot",
+    ]
+
+
+def test_walker_skips_consumed_subtrees():
+    assert walk(ConsumingListener(), "SELECT a FROM t;") == ["enterStmt", "exitStmt", "exitRoot"]
+
+
+def test_walker_visits_every_rule_when_generic_hooks_are_overridden():
+    events = walk(EveryRuleListener(), "SELECT a FROM t;")
+    assert "enterColumnref a" in events
+    assert events.count("every") > 10